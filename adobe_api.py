@@ -1,20 +1,212 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import os
+import time
 import streamlit as st
 import json
 from typing import Dict, Any, Optional
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-def get_adobe_access_token() -> Optional[str]:
+
+# One pooled session for IMS and Analytics API calls so repeat requests reuse
+# the TLS connection; transient 429/5xx responses to GETs are retried with backoff
+# (urllib3 does not retry POSTs on status, so segment creation is never repeated)
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=16,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504],
+                      raise_on_status=False)
+))
+_SESSION.headers.update({'Accept': 'application/json'})
+
+# Last segments listing per (endpoint, client ID): validators plus the raw body,
+# so unchanged listings can be revalidated instead of re-downloaded
+_SEGMENTS_CACHE: Dict[tuple, Dict[str, Any]] = {}
+
+# Top-level fields every segment payload must carry, and the fields the
+# Analytics API requires inside its definition
+_SEGMENT_REQUIRED_FIELDS = ('name', 'description', 'rsid', 'definition')
+_DEFINITION_REQUIRED_FIELDS = ('version', 'func', 'container')
+
+# Most recent IMS access token and the monotonic time after which it is refreshed
+_TOKEN_CACHE: Dict[str, Any] = {'token': None, 'expires_at': 0.0}
+
+# Refresh this many seconds before IMS says the token expires
+_TOKEN_EXPIRY_MARGIN = 300
+
+# Segments collection endpoint for a company ID
+_SEGMENTS_URL = "https://analytics.adobe.io/api/{}/segments".format
+
+# Headers shared by every Analytics 2.0 API call; copied per request and
+# completed with the caller's token and client ID
+_API_HEADERS_TEMPLATE = {
+    'Content-Type': 'application/json'
+}
+
+
+def _json_loads(content: bytes) -> Any:
+    """Parse a JSON response body, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def _json_dumps(obj: Any) -> bytes:
+    """Serialize a request body to JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode('utf-8')
+
+
+def _is_valid_company_id(company_id: str) -> bool:
+    """Check that a company ID contains only letters, numbers, hyphens and underscores."""
+    return company_id.replace('-', '').replace('_', '').isalnum()
+
+
+def _validate_segment_payload(segment_payload: Dict[str, Any]) -> Optional[str]:
+    """
+    Check the shape of a segment payload before it is sent to the API.
+    
+    Args:
+        segment_payload (dict): Complete segment definition JSON object
+        
+    Returns:
+        str: Error message for the first problem found, None if the payload is valid
+    """
+    if not isinstance(segment_payload, dict):
+        return 'Segment payload must be a JSON object'
+    
+    for field in _SEGMENT_REQUIRED_FIELDS:
+        if field not in segment_payload:
+            return f'Missing required field: {field}'
+    
+    definition = segment_payload['definition']
+    if not isinstance(definition, dict):
+        return 'Segment definition must be a JSON object'
+    
+    for field in _DEFINITION_REQUIRED_FIELDS:
+        if field not in definition:
+            return f'Missing required field: definition.{field}'
+    
+    return None
+
+
+def _debug_enabled() -> bool:
+    """Whether request/response tracing is turned on via the ADOBE_DEBUG secret."""
+    return bool(st.secrets.get("ADOBE_DEBUG", False))
+
+
+def _attr(rule: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the attribute reference a rule compares against."""
+    return {"func": "attr", "name": rule.get("name", "variables/page")}
+
+
+def _pred_str(func: str, rule: Dict[str, Any]) -> Dict[str, Any]:
+    """Predicate comparing an attribute with a string value."""
+    return {"func": func, "val": _attr(rule), "str": rule.get("val", "Homepage")}
+
+
+def _pred_num(func: str, rule: Dict[str, Any]) -> Dict[str, Any]:
+    """Predicate comparing an attribute with a numeric value."""
+    return {"func": func, "val": _attr(rule), "num": rule.get("val", 0)}
+
+
+def _pred_evt(func: str, rule: Dict[str, Any]) -> Dict[str, Any]:
+    """Predicate checking that an event occurred."""
+    return {"func": func, "evt": {"func": "event", "name": rule.get("name", "metrics/pageviews")}}
+
+
+def _pred_list(func: str, rule: Dict[str, Any]) -> Dict[str, Any]:
+    """Predicate matching an attribute against a list of strings."""
+    val = rule.get("val", [])
+    return {"func": func, "val": _attr(rule), "list": val if isinstance(val, list) else [val]}
+
+
+# Predicate builder for each supported rule function; anything not listed is
+# treated as a string comparison
+_PRED_BUILDERS = {
+    'gt': _pred_num,
+    'ge': _pred_num,
+    'lt': _pred_num,
+    'le': _pred_num,
+    'eq': _pred_num,
+    'ne': _pred_num,
+    'event-exists': _pred_evt,
+    'streq-in': _pred_list,
+    'not-streq-in': _pred_list,
+}
+
+
+def _rule_to_pred(rule: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the Adobe predicate for a single simplified segment rule."""
+    func = rule.get("func", "streq")
+    return _PRED_BUILDERS.get(func, _pred_str)(func, rule)
+
+
+def _error_response(response: requests.Response) -> Dict[str, Any]:
+    """Build the error result for a failed API call, reading the body once."""
+    raw = response.content
+    try:
+        message = str(_json_loads(raw))
+    except ValueError:
+        message = raw.decode('utf-8', 'replace')
+    return {'status': 'error', 'code': response.status_code, 'message': message}
+
+
+def _api_headers(access_token: str, client_id: str) -> Dict[str, str]:
+    """Build request headers for an Analytics 2.0 API call."""
+    headers = _API_HEADERS_TEMPLATE.copy()
+    headers['Authorization'] = f"Bearer {access_token}"
+    headers['x-api-key'] = client_id
+    return headers
+
+
+def _post_with_token_refresh(url: str, access_token: str, client_id: str, data: Any) -> requests.Response:
+    """
+    POST to an Analytics API endpoint, retrying once with a fresh token on 401.
+    
+    Args:
+        url (str): Endpoint URL
+        access_token (str): Current access token
+        client_id (str): Adobe client ID
+        data: Serialized request body
+        
+    Returns:
+        requests.Response: Response from the last attempt
+    """
+    response = _SESSION.post(url, headers=_api_headers(access_token, client_id), data=data, timeout=30)
+    if response.status_code == 401:
+        # The cached token was revoked or expired early; mint a new one and retry
+        access_token = get_adobe_access_token(force_refresh=True)
+        if access_token:
+            response = _SESSION.post(url, headers=_api_headers(access_token, client_id), data=data, timeout=30)
+    return response
+
+
+def get_adobe_access_token(force_refresh: bool = False) -> Optional[str]:
     """
     Get Adobe access token using JWT authentication.
     
+    Tokens are reused until shortly before they expire.
+    
+    Args:
+        force_refresh (bool): Request a new token even if a cached one is still valid
+        
     Returns:
         str: Access token if successful, None if failed
         
     Raises:
         Exception: If required secrets are missing or API call fails
     """
+    if not force_refresh and _TOKEN_CACHE['token'] and time.monotonic() < _TOKEN_CACHE['expires_at']:
+        return _TOKEN_CACHE['token']
+    
     try:
         # Read required secrets from Streamlit
         client_id = st.secrets.get("ADOBE_CLIENT_ID")
@@ -48,18 +240,21 @@ def get_adobe_access_token() -> Optional[str]:
         }
         
         # Make POST request to get access token
-        st.info(f"Making request to: {ims_endpoint}")
-        st.info(f"Payload: {payload}")
+        debug = _debug_enabled()
+        if debug:
+            st.info(f"Making request to: {ims_endpoint}")
+            st.info(f"Payload: {payload}")
         
-        response = requests.post(
+        response = _SESSION.post(
             ims_endpoint,
             data=payload,
             headers={'Content-Type': 'application/x-www-form-urlencoded'},
             timeout=30
         )
         
-        st.info(f"Response status: {response.status_code}")
-        st.info(f"Response headers: {dict(response.headers)}")
+        if debug:
+            st.info(f"Response status: {response.status_code}")
+            st.info(f"Response headers: {dict(response.headers)}")
         
         # Check if request was successful
         if response.status_code != 200:
@@ -73,8 +268,11 @@ def get_adobe_access_token() -> Optional[str]:
         # Parse JSON response
         token_data = response.json()
         
-        # Extract access token
+        # Extract access token and remember it until shortly before it expires
         if 'access_token' in token_data:
+            expires_in = token_data.get('expires_in', 86400)
+            _TOKEN_CACHE['token'] = token_data['access_token']
+            _TOKEN_CACHE['expires_at'] = time.monotonic() + max(expires_in - _TOKEN_EXPIRY_MARGIN, 0)
             return token_data['access_token']
         else:
             raise ValueError(f"Access token not found in response: {token_data}")
@@ -131,7 +329,7 @@ def create_analytics_segment(name: str, description: str, definition_json: Dict[
             return None
         
         # Check if company ID contains only valid characters (alphanumeric and hyphens)
-        if not company_id.replace('-', '').replace('_', '').isalnum():
+        if not _is_valid_company_id(company_id):
             st.warning(f"Company ID '{company_id}' contains invalid characters. Adobe company IDs should contain only letters, numbers, hyphens, and underscores.")
             return None
         
@@ -160,6 +358,7 @@ def create_analytics_segment(name: str, description: str, definition_json: Dict[
             'name': name,
             'description': description
         }
+        debug = _debug_enabled()
         
         # For Adobe Analytics 2.0 API, the definition should be at root level
         # Extract the inner definition if it's nested under 'definition' key
@@ -168,38 +367,44 @@ def create_analytics_segment(name: str, description: str, definition_json: Dict[
                 # If definition_json has a nested 'definition', extract it
                 inner_definition = definition_json['definition']
                 request_body.update(inner_definition)
-                st.info(f"🔧 Extracted nested definition: {inner_definition}")
+                if debug:
+                    st.info(f"🔧 Extracted nested definition: {inner_definition}")
             else:
                 # Otherwise, merge the entire definition_json
                 request_body.update(definition_json)
-                st.info(f"🔧 Merged definition directly: {definition_json}")
+                if debug:
+                    st.info(f"🔧 Merged definition directly: {definition_json}")
         else:
             st.error("Invalid definition format. Expected dictionary.")
             return None
         
-        st.info(f"🎯 Final request body: {request_body}")
+        if debug:
+            st.info(f"🎯 Final request body: {request_body}")
         
         # Try multiple endpoints if one fails
         for endpoint in possible_endpoints:
-            st.info(f"🔍 Trying endpoint: {endpoint}")
-            st.info(f"📤 Request body: {request_body}")
-            st.info(f"🔑 Headers: {dict(headers)}")
+            if debug:
+                st.info(f"🔍 Trying endpoint: {endpoint}")
+                st.info(f"📤 Request body: {request_body}")
+                st.info(f"🔑 Headers: {dict(headers)}")
             
             try:
-                response = requests.post(
+                response = _SESSION.post(
                     endpoint,
                     headers=headers,
                     json=request_body,
                     timeout=60
                 )
                 
-                st.info(f"📥 Response status: {response.status_code}")
-                st.info(f"📥 Response headers: {dict(response.headers)}")
+                if debug:
+                    st.info(f"📥 Response status: {response.status_code}")
+                    st.info(f"📥 Response headers: {dict(response.headers)}")
                 
                 # If successful, break out of the loop
                 if response.status_code < 400:
                     st.success(f"✅ Success with endpoint: {endpoint}")
-                    st.info(f"📥 Response body: {response.text}")
+                    if debug:
+                        st.info(f"📥 Response body: {response.text}")
                     break
                     
                 # If it's a 403025 error, try the next endpoint
@@ -263,7 +468,7 @@ def get_company_id() -> Optional[str]:
         return None
     
     # Check if company ID contains only valid characters
-    if not company_id.replace('-', '').replace('_', '').isalnum():
+    if not _is_valid_company_id(company_id):
         st.warning(f"⚠️ Company ID '{company_id}' contains invalid characters")
         st.info("""
         **Adobe Company ID Format:**
@@ -328,7 +533,7 @@ def validate_api_secrets() -> bool:
         return False
     
     # Validate company ID format
-    if not company_id.replace('-', '').replace('_', '').isalnum():
+    if not _is_valid_company_id(company_id):
         st.error("❌ Invalid Company ID format. Contains invalid characters.")
         st.info("""
         **Adobe Company ID Format:**
@@ -367,7 +572,7 @@ def test_api_connection() -> bool:
         if not validate_oauth_secrets():
             return False
             
-        access_token = get_adobe_access_token()
+        access_token = get_adobe_access_token(force_refresh=True)
         if access_token:
             st.success("✅ Successfully connected to Adobe API")
             st.info("""
@@ -388,6 +593,28 @@ def test_api_connection() -> bool:
         return False
 
 
+# Sample segment definition using Adobe Analytics 2.0 API format
+# This creates a simple segment for page views > 1
+# The API expects the definition at root level, not nested under 'definition'
+_SAMPLE_SEGMENT_DEFINITION = {
+    "container": {
+        "func": "container",
+        "context": "visitors",
+        "pred": {
+            "func": "pred",
+            "expr": {
+                "func": "expr",
+                "func_name": "gt",
+                "args": [
+                    {"func": "attr", "name": "page_views"},
+                    {"func": "const", "val": 1}
+                ]
+            }
+        }
+    }
+}
+
+
 def create_sample_segment() -> bool:
     """
     Create a sample segment for testing purposes.
@@ -402,31 +629,10 @@ def create_sample_segment() -> bool:
             st.error("❌ Cannot create segment - missing required secrets")
             return False
         
-        # Sample segment definition using Adobe Analytics 2.0 API format
-        # This creates a simple segment for page views > 1
-        # The API expects the definition at root level, not nested under 'definition'
-        sample_definition = {
-            "container": {
-                "func": "container",
-                "context": "visitors",
-                "pred": {
-                    "func": "pred",
-                    "expr": {
-                        "func": "expr",
-                        "func_name": "gt",
-                        "args": [
-                            {"func": "attr", "name": "page_views"},
-                            {"func": "const", "val": 1}
-                        ]
-                    }
-                }
-            }
-        }
-        
         result = create_analytics_segment(
             name="Test Segment - High Page Views",
             description="Test segment for users with more than 10 page views",
-            definition_json=sample_definition
+            definition_json=_SAMPLE_SEGMENT_DEFINITION
         )
         
         if result:
@@ -478,55 +684,38 @@ def create_analytics_segment_from_json(segment_payload: Dict[str, Any]) -> Dict[
             }
         }
     """
+    # 1. Validate the input payload before any secret lookups or network calls
+    validation_error = _validate_segment_payload(segment_payload)
+    if validation_error:
+        return {'status': 'error', 'message': validation_error}
+    
     try:
-        # 1. Authentication and Setup - Get access token, client ID, and company ID
-        access_token = get_adobe_access_token()
-        if not access_token:
-            return {'status': 'error', 'message': 'Failed to authenticate with Adobe.'}
-        
-        # Read credentials from Streamlit secrets
+        # 2. Authentication and Setup - Read credentials, then get the access token
         client_id = st.secrets.get("ADOBE_CLIENT_ID")
         company_id = st.secrets.get("ADOBE_COMPANY_ID")
         
         if not client_id or not company_id:
             return {'status': 'error', 'message': 'Missing required credentials (ADOBE_CLIENT_ID or ADOBE_COMPANY_ID)'}
         
-        # 2. Validate the input payload
-        required_fields = ['name', 'description', 'rsid', 'definition']
-        for field in required_fields:
-            if field not in segment_payload:
-                return {'status': 'error', 'message': f'Missing required field: {field}'}
+        access_token = get_adobe_access_token()
+        if not access_token:
+            return {'status': 'error', 'message': 'Failed to authenticate with Adobe.'}
         
         # 3. Use the provided payload directly
         body = segment_payload.copy()
         
-        # 4. Construct URL and headers
-        url = f"https://analytics.adobe.io/api/{company_id}/segments"
-        headers = {
-            'Authorization': f"Bearer {access_token}",
-            'x-api-key': client_id,
-            'Content-Type': 'application/json'
-        }
+        # 4. Construct URL
+        url = _SEGMENTS_URL(company_id)
         
         # 5. Make the API POST request
-        response = requests.post(
-            url,
-            headers=headers,
-            data=json.dumps(body),
-            timeout=30
-        )
+        response = _post_with_token_refresh(url, access_token, client_id, _json_dumps(body))
         
         # 6. Handle the response
         if response.status_code in [200, 201]:  # Adobe Analytics returns 200 for successful creation
-            response_data = response.json()
+            response_data = _json_loads(response.content)
             return {'status': 'success', 'data': response_data}
         else:
-            # Try to parse error response as JSON
-            try:
-                error_json = response.json()
-                return {'status': 'error', 'code': response.status_code, 'message': str(error_json)}
-            except:
-                return {'status': 'error', 'code': response.status_code, 'message': response.text}
+            return _error_response(response)
             
     except requests.exceptions.RequestException as e:
         return {'status': 'error', 'message': f'Request failed: {str(e)}'}
@@ -557,6 +746,9 @@ def create_analytics_segment_enhanced(name: str, description: str, rsid: str, co
             {'func': 'gt', 'name': 'metrics/pageviews', 'val': 10}
         ]
     """
+    if not rules:
+        return {'status': 'error', 'message': 'At least one rule is required to create a segment.'}
+    
     try:
         # 1. Authentication and Setup
         access_token = get_adobe_access_token()
@@ -573,49 +765,23 @@ def create_analytics_segment_enhanced(name: str, description: str, rsid: str, co
         # 2. Build the segment definition structure
         if len(rules) == 1:
             # Single rule - use the exact structure from working examples
-            rule = rules[0]
-            definition = {
-                "version": [1, 0, 0],
-                "func": "segment",
-                "container": {
-                    "func": "container",
-                    "context": container_context,
-                    "pred": {
-                        "func": rule.get("func", "streq"),
-                        "val": {
-                            "func": "attr",
-                            "name": rule.get("name", "variables/page")
-                        },
-                        "str": rule.get("val", "Homepage")
-                    }
-                }
-            }
+            pred = _rule_to_pred(rules[0])
         else:
-            # Multiple rules - extend the structure for multiple conditions
-            definition = {
-                "version": [1, 0, 0],
-                "func": "segment",
-                "container": {
-                    "func": "container",
-                    "context": container_context,
-                    "pred": {
-                        "func": "and",
-                        "vals": []
-                    }
-                }
+            # Multiple rules - combine the individual predicates with "and"
+            pred = {
+                "func": "and",
+                "vals": [_rule_to_pred(rule) for rule in rules]
             }
-            
-            # Build individual rule predicates
-            for rule in rules:
-                rule_pred = {
-                    "func": rule.get("func", "streq"),
-                    "val": {
-                        "func": "attr",
-                        "name": rule.get("name", "variables/page")
-                    },
-                    "str": rule.get("val", "Homepage")
-                }
-                definition["container"]["pred"]["vals"].append(rule_pred)
+        
+        definition = {
+            "version": [1, 0, 0],
+            "func": "segment",
+            "container": {
+                "func": "container",
+                "context": container_context,
+                "pred": pred
+            }
+        }
         
         # 3. Construct the final payload
         body = {
@@ -626,30 +792,15 @@ def create_analytics_segment_enhanced(name: str, description: str, rsid: str, co
         }
         
         # 4. Make the API request
-        url = f"https://analytics.adobe.io/api/{company_id}/segments"
-        headers = {
-            'Authorization': f"Bearer {access_token}",
-            'x-api-key': client_id,
-            'Content-Type': 'application/json'
-        }
-        
-        response = requests.post(
-            url,
-            headers=headers,
-            data=json.dumps(body),
-            timeout=30
-        )
+        url = _SEGMENTS_URL(company_id)
+        response = _post_with_token_refresh(url, access_token, client_id, _json_dumps(body))
         
         # 5. Handle the response
         if response.status_code in [200, 201]:  # Adobe Analytics returns 200 for successful creation
-            response_data = response.json()
+            response_data = _json_loads(response.content)
             return {'status': 'success', 'data': response_data}
         else:
-            try:
-                error_json = response.json()
-                return {'status': 'error', 'code': response.status_code, 'message': str(error_json)}
-            except:
-                return {'status': 'error', 'code': response.status_code, 'message': response.text}
+            return _error_response(response)
             
     except requests.exceptions.RequestException as e:
         return {'status': 'error', 'message': f'Request failed: {str(e)}'}
@@ -671,37 +822,48 @@ def get_adobe_segments(access_token: str, client_id: str, company_id: str) -> Di
     """
     try:
         # Construct API endpoint URL
-        segments_endpoint = f"https://analytics.adobe.io/api/{company_id}/segments"
+        segments_endpoint = _SEGMENTS_URL(company_id)
         
-        # Request headers
-        headers = {
-            'Authorization': f'Bearer {access_token}',
-            'x-api-key': client_id,
-            'Content-Type': 'application/json',
-            'Accept': 'application/json'
-        }
+        # Request headers (Accept comes from the shared session)
+        headers = _api_headers(access_token, client_id)
+        
+        # Ask the API to skip the body if the listing has not changed
+        cache_key = (segments_endpoint, client_id)
+        cached = _SEGMENTS_CACHE.get(cache_key)
+        if cached:
+            if cached['etag']:
+                headers['If-None-Match'] = cached['etag']
+            if cached['last_modified']:
+                headers['If-Modified-Since'] = cached['last_modified']
         
         # Make GET request
-        response = requests.get(
+        response = _SESSION.get(
             segments_endpoint,
             headers=headers,
             timeout=30
         )
         
+        if cached and response.status_code == 304:
+            return {'status': 'success', 'data': _json_loads(cached['body'])}
+        
         # Check if request was successful
         if response.status_code == 200:
+            raw = response.content
             try:
-                segments_data = response.json()
+                segments_data = _json_loads(raw)
+                etag = response.headers.get('ETag')
+                last_modified = response.headers.get('Last-Modified')
+                if etag or last_modified:
+                    _SEGMENTS_CACHE[cache_key] = {
+                        'etag': etag,
+                        'last_modified': last_modified,
+                        'body': raw
+                    }
                 return {'status': 'success', 'data': segments_data}
             except json.JSONDecodeError as e:
                 return {'status': 'error', 'message': f'Failed to parse JSON response: {e}'}
         else:
-            # Try to get error details
-            try:
-                error_data = response.json()
-                return {'status': 'error', 'code': response.status_code, 'message': str(error_data)}
-            except:
-                return {'status': 'error', 'code': response.status_code, 'message': response.text}
+            return _error_response(response)
             
     except requests.exceptions.RequestException as e:
         return {'status': 'error', 'message': f'Request failed: {str(e)}'}
@@ -737,7 +899,7 @@ if __name__ == "__main__":
     company_id = st.secrets.get("ADOBE_COMPANY_ID")
     if company_id:
         # Check if company ID contains only valid characters
-        if company_id.replace('-', '').replace('_', '').isalnum():
+        if _is_valid_company_id(company_id):
             st.success(f"✅ Company ID '{company_id}' format looks correct")
             st.info(f"**Length:** {len(company_id)} characters")
         else:
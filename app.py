@@ -11,9 +11,6 @@ import re
 from pathlib import Path
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.vectorstores import FAISS
-from langchain_ollama import OllamaLLM
-from langchain_groq import ChatGroq
-from langchain_anthropic import ChatAnthropic
 from langchain.chains import RetrievalQA
 from langchain.prompts import PromptTemplate
 import json
@@ -40,13 +37,18 @@ def categorize_sources(sources):
     
     return adobe_sources, stackoverflow_sources
 
+@st.cache_resource
+def get_source_attributor():
+    """Shared SourceAttributor, so its source lookup caches persist across reruns"""
+    return SourceAttributor()
+
 def generate_source_attributions(sources, format_type="markdown"):
     """Generate proper attributions for sources using the attribution system"""
     if not SOURCE_ATTRIBUTION_AVAILABLE:
         return []
     
     try:
-        attributor = SourceAttributor()
+        attributor = get_source_attributor()
         attributions = attributor.generate_bulk_attribution(sources, format_type)
         return attributions
     except Exception as e:
@@ -59,7 +61,7 @@ def get_simple_attributions(sources):
         return []
     
     try:
-        attributor = SourceAttributor()
+        attributor = get_source_attributor()
         attributions = attributor.generate_bulk_attribution(sources, "markdown")
         return attributions
     except Exception as e:
@@ -70,6 +72,20 @@ def has_stackoverflow_sources(sources):
     """Check if any sources are from Stack Overflow"""
     return any(source.startswith('stackoverflow_') for source in sources)
 
+# Action words that mark a query as a create request
+CREATE_ACTION_WORDS = ('create', 'build', 'make', 'set up', 'establish', 'generate')
+
+# Supported action objects with enhanced detection, in priority order
+CREATE_ACTION_KEYWORDS = {
+    'dashboard': ('dashboard', 'dashboards', 'board'),
+    'calculated metrics': ('calculated metrics', 'calculated metric', 'metric', 'metrics', 'kpi'),
+    'workspace': ('workspace', 'analysis workspace', 'project', 'analysis'),
+    'report': ('report', 'reports', 'reporting'),
+    'alert': ('alert', 'alerts', 'notification'),
+    'filter': ('filter', 'filters', 'filtering'),
+    'visualization': ('visualization', 'chart', 'charts', 'graph', 'plot')
+}
+
 def detect_create_action(query):
     """
     Enhanced function to detect create actions and extract detailed information.
@@ -80,41 +96,16 @@ def detect_create_action(query):
     query_lower = query.lower()
     
     # Check if query contains 'create' or similar action words
-    action_words = ['create', 'build', 'make', 'set up', 'establish', 'generate']
-    has_action = any(word in query_lower for word in action_words)
-    
-    if not has_action:
+    if not any(word in query_lower for word in CREATE_ACTION_WORDS):
         return None, None
     
-    # Define supported action objects with enhanced detection
-    action_keywords = {
-        'dashboard': ['dashboard', 'dashboards', 'board'],
-        'calculated metrics': ['calculated metrics', 'calculated metric', 'metric', 'metrics', 'kpi'],
-        'workspace': ['workspace', 'analysis workspace', 'project', 'analysis'],
-        'report': ['report', 'reports', 'reporting'],
-        'alert': ['alert', 'alerts', 'notification'],
-        'filter': ['filter', 'filters', 'filtering'],
-        'visualization': ['visualization', 'chart', 'charts', 'graph', 'plot']
-    }
-    
-    # Find which action object is mentioned
-    detected_action = None
-    detected_keyword = None
-    
-    for action_type, keywords in action_keywords.items():
+    # Find which action object is mentioned, in priority order
+    for action_type, keywords in CREATE_ACTION_KEYWORDS.items():
         for keyword in keywords:
             if keyword in query_lower:
-                detected_action = action_type
-                detected_keyword = keyword
-                break
-        if detected_action:
-            break
+                return action_type, keyword
     
-    if not detected_action:
-        return None, None
-    
-    
-    return detected_action, detected_keyword
+    return None, None
 
 
 def detect_segment_intent_with_claude(query, claude_llm=None):
@@ -163,7 +154,6 @@ Return only valid JSON, no additional text."""
         response = claude_llm.invoke(prompt)
         
         # Parse Claude's response
-        import json
         try:
             claude_analysis = json.loads(response.content.strip())
             
@@ -195,6 +185,71 @@ Return only valid JSON, no additional text."""
         print(f"Error in Claude intent detection: {e}")
         return None
 
+# Keyword patterns for segment intent detection, by subtype in priority order
+SEGMENT_AUDIENCE_PATTERNS = {
+    'visitors': ['visitors', 'users', 'people', 'audience', 'customers'],
+    'visits': ['visits', 'sessions', 'trips'],
+    'hits': ['hits', 'page views', 'clicks', 'interactions']
+}
+
+SEGMENT_GEO_PATTERNS = {
+    'country': ['country', 'nation', 'usa', 'united states', 'us', 'canada', 'uk', 'germany'],
+    'city': ['city', 'town', 'new york', 'london', 'toronto', 'berlin'],
+    'state': ['state', 'province', 'california', 'texas', 'ontario'],
+    'zip': ['zip', 'postal', 'postcode', 'area code']
+}
+
+SEGMENT_DEVICE_PATTERNS = {
+    'mobile': ['mobile', 'phone', 'smartphone', 'ios', 'android'],
+    'desktop': ['desktop', 'computer', 'pc', 'mac', 'laptop'],
+    'tablet': ['tablet', 'ipad', 'android tablet']
+}
+
+SEGMENT_BEHAVIORAL_PATTERNS = {
+    'page_views': ['page views', 'pages', 'pageviews', 'page count'],
+    'time_on_site': ['time on site', 'session duration', 'visit length', 'dwell time'],
+    'bounce_rate': ['bounce', 'bounce rate', 'single page'],
+    'conversion': ['conversion', 'purchase', 'goal', 'objective', 'target'],
+    'cart': ['cart', 'shopping cart', 'basket', 'add to cart'],
+    'checkout': ['checkout', 'payment', 'purchase funnel']
+}
+
+SEGMENT_TIME_PATTERNS = {
+    'day_of_week': ['weekday', 'weekend', 'monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday'],
+    'time_of_day': ['morning', 'afternoon', 'evening', 'night', 'business hours'],
+    'seasonal': ['seasonal', 'holiday', 'christmas', 'black friday', 'summer', 'winter']
+}
+
+SEGMENT_CUSTOM_VAR_PATTERNS = ['evar', 'prop', 'variable', 'custom', 'attribute']
+
+
+# Short keywords that must match as whole words: 'us' otherwise matches inside
+# 'users', 'uk' inside 'duke' and 'pc' inside 'topic'
+_WHOLE_WORD_KEYWORDS = frozenset({'us', 'uk', 'pc'})
+
+
+def _keyword_checks(groups):
+    """
+    Split each subtype's keywords into plain substrings and one precompiled
+    whole-word regex (None when it has no whole-word keywords), preserving
+    subtype priority order
+    """
+    checks = []
+    for name, patterns in groups.items():
+        whole_words = [pattern for pattern in patterns if pattern in _WHOLE_WORD_KEYWORDS]
+        checks.append((
+            name,
+            tuple(pattern for pattern in patterns if pattern not in _WHOLE_WORD_KEYWORDS),
+            re.compile(rf"\b(?:{'|'.join(map(re.escape, whole_words))})\b") if whole_words else None,
+        ))
+    return checks
+
+
+# Only the geographic and device keywords include whole-word keywords
+_GEO_CHECKS = _keyword_checks(SEGMENT_GEO_PATTERNS)
+_DEVICE_CHECKS = _keyword_checks(SEGMENT_DEVICE_PATTERNS)
+
+
 def detect_segment_creation_intent(query, query_lower):
     """
     Detect detailed segment creation intent from user query.
@@ -219,13 +274,7 @@ def detect_segment_creation_intent(query, query_lower):
     }
     
     # Detect target audience
-    audience_patterns = {
-        'visitors': ['visitors', 'users', 'people', 'audience', 'customers'],
-        'visits': ['visits', 'sessions', 'trips'],
-        'hits': ['hits', 'page views', 'clicks', 'interactions']
-    }
-    
-    for audience_type, patterns in audience_patterns.items():
+    for audience_type, patterns in SEGMENT_AUDIENCE_PATTERNS.items():
         if any(pattern in query_lower for pattern in patterns):
             intent_details['target_audience'] = audience_type
             break
@@ -235,69 +284,43 @@ def detect_segment_creation_intent(query, query_lower):
         intent_details['target_audience'] = 'visitors'
     
     # Detect geographic targeting
-    geo_patterns = {
-        'country': ['country', 'nation', 'usa', 'united states', 'us', 'canada', 'uk', 'germany'],
-        'city': ['city', 'town', 'new york', 'london', 'toronto', 'berlin'],
-        'state': ['state', 'province', 'california', 'texas', 'ontario'],
-        'zip': ['zip', 'postal', 'postcode', 'area code']
-    }
-    
-    for geo_type, patterns in geo_patterns.items():
-        if any(pattern in query_lower for pattern in patterns):
+    for geo_type, substrings, whole_word_re in _GEO_CHECKS:
+        if (any(pattern in query_lower for pattern in substrings)
+                or (whole_word_re and whole_word_re.search(query_lower))):
             intent_details['geographic'] = geo_type
             break
     
     # Detect device targeting
-    device_patterns = {
-        'mobile': ['mobile', 'phone', 'smartphone', 'ios', 'android'],
-        'desktop': ['desktop', 'computer', 'pc', 'mac', 'laptop'],
-        'tablet': ['tablet', 'ipad', 'android tablet']
-    }
-    
-    for device_type, patterns in device_patterns.items():
-        if any(pattern in query_lower for pattern in patterns):
+    for device_type, substrings, whole_word_re in _DEVICE_CHECKS:
+        if (any(pattern in query_lower for pattern in substrings)
+                or (whole_word_re and whole_word_re.search(query_lower))):
             intent_details['device'] = device_type
             break
     
     # Detect behavioral conditions
-    behavioral_patterns = {
-        'page_views': ['page views', 'pages', 'pageviews', 'page count'],
-        'time_on_site': ['time on site', 'session duration', 'visit length', 'dwell time'],
-        'bounce_rate': ['bounce', 'bounce rate', 'single page'],
-        'conversion': ['conversion', 'purchase', 'goal', 'objective', 'target'],
-        'cart': ['cart', 'shopping cart', 'basket', 'add to cart'],
-        'checkout': ['checkout', 'payment', 'purchase funnel']
-    }
-    
-    for behavior_type, patterns in behavioral_patterns.items():
-        if any(pattern in query_lower for pattern in patterns):
-            intent_details['behavioral'].append(behavior_type)
+    intent_details['behavioral'] = [
+        behavior_type for behavior_type, patterns in SEGMENT_BEHAVIORAL_PATTERNS.items()
+        if any(pattern in query_lower for pattern in patterns)
+    ]
     
     # Detect time-based targeting
-    time_patterns = {
-        'day_of_week': ['weekday', 'weekend', 'monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday'],
-        'time_of_day': ['morning', 'afternoon', 'evening', 'night', 'business hours'],
-        'seasonal': ['seasonal', 'holiday', 'christmas', 'black friday', 'summer', 'winter']
-    }
-    
-    for time_type, patterns in time_patterns.items():
+    for time_type, patterns in SEGMENT_TIME_PATTERNS.items():
         if any(pattern in query_lower for pattern in patterns):
             intent_details['time_based'] = time_type
             break
     
     # Detect custom variables (eVar, prop, etc.)
-    custom_var_patterns = ['evar', 'prop', 'variable', 'custom', 'attribute']
-    if any(pattern in query_lower for pattern in custom_var_patterns):
+    if any(pattern in query_lower for pattern in SEGMENT_CUSTOM_VAR_PATTERNS):
         intent_details['custom_variables'].append('custom_variable')
     
     # Set confidence level based on detected information
-    detected_count = sum([
-        1 if intent_details['geographic'] else 0,
-        1 if intent_details['device'] else 0,
-        len(intent_details['behavioral']),
-        1 if intent_details['time_based'] else 0,
-        len(intent_details['custom_variables'])
-    ])
+    detected_count = (
+        (1 if intent_details['geographic'] else 0)
+        + (1 if intent_details['device'] else 0)
+        + len(intent_details['behavioral'])
+        + (1 if intent_details['time_based'] else 0)
+        + len(intent_details['custom_variables'])
+    )
     
     if detected_count >= 3:
         intent_details['intent_confidence'] = 'high'
@@ -591,7 +614,6 @@ Return only valid JSON, no additional text."""
         response = claude_llm.invoke(prompt)
         
         # Parse Claude's response
-        import json
         try:
             definition = json.loads(response.content.strip())
             return definition
@@ -694,7 +716,6 @@ Return only valid JSON, no additional text."""
         response = claude_llm.invoke(prompt)
         
         # Parse Claude's response
-        import json
         try:
             claude_suggestions = json.loads(response.content.strip())
             
@@ -818,7 +839,6 @@ Return only valid JSON, no additional text."""
         response = claude_llm.invoke(prompt)
         
         # Parse Claude's response
-        import json
         try:
             claude_rules = json.loads(response.content.strip())
             
@@ -969,6 +989,8 @@ def setup_direct_llm(provider="Anthropic Claude (Cloud)"):
                     st.error("❌ Groq API key not found. Please add GROQ_API_KEY to Streamlit secrets.")
                     return None
                 
+                from langchain_groq import ChatGroq
+                
                 llm = ChatGroq(
                     groq_api_key=groq_api_key,
                     model_name="llama-3.1-8b-instant",
@@ -981,9 +1003,10 @@ def setup_direct_llm(provider="Anthropic Claude (Cloud)"):
                     test_response = llm.invoke("Hello")
                     st.success("✅ Groq connection successful!")
                 except Exception as groq_error:
-                    if "rate limit" in str(groq_error).lower() or "quota" in str(groq_error).lower():
+                    error_text = str(groq_error).lower()
+                    if "rate limit" in error_text or "quota" in error_text:
                         st.error("❌ Groq rate limit exceeded. Please try again later or switch to another provider.")
-                    elif "unauthorized" in str(groq_error).lower() or "invalid" in str(groq_error).lower():
+                    elif "unauthorized" in error_text or "invalid" in error_text:
                         st.error("❌ Invalid Groq API key. Please check your API key.")
                     else:
                         st.error(f"❌ Groq connection error: {groq_error}")
@@ -1001,6 +1024,8 @@ def setup_direct_llm(provider="Anthropic Claude (Cloud)"):
                     st.error("❌ Anthropic API key not found. Please add ANTHROPIC_API_KEY to Streamlit secrets.")
                     return None
                 
+                from langchain_anthropic import ChatAnthropic
+                
                 llm = ChatAnthropic(
                     anthropic_api_key=anthropic_api_key,
                     model_name="claude-3-5-haiku-20241022",  # Claude 3.5 Haiku - Fast and efficient # old: claude-3-5-sonnet-20241022
@@ -1013,9 +1038,10 @@ def setup_direct_llm(provider="Anthropic Claude (Cloud)"):
                     test_response = llm.invoke("Hello")
 
                 except Exception as claude_error:
-                    if "rate limit" in str(claude_error).lower() or "quota" in str(claude_error).lower():
+                    error_text = str(claude_error).lower()
+                    if "rate limit" in error_text or "quota" in error_text:
                         st.error("❌ Anthropic rate limit exceeded. Please try again later or switch to another provider.")
-                    elif "unauthorized" in str(claude_error).lower() or "invalid" in str(claude_error).lower():
+                    elif "unauthorized" in error_text or "invalid" in error_text:
                         st.error("❌ Invalid Anthropic API key. Please check your API key.")
                     else:
                         st.error(f"❌ Anthropic Claude connection error: {claude_error}")
@@ -1028,6 +1054,8 @@ def setup_direct_llm(provider="Anthropic Claude (Cloud)"):
         else:
             # Initialize Ollama LLM (fallback)
             try:
+                from langchain_ollama import OllamaLLM
+                
                 llm = OllamaLLM(
                     model="llama3:8b",  # Using the available model
                     temperature=0.1,
@@ -1065,6 +1093,8 @@ def setup_qa_chain(_vectorstore, provider="Anthropic Claude (Cloud)"):
                     st.error("❌ Groq API key not found. Please add GROQ_API_KEY to Streamlit secrets.")
                     return None
                 
+                from langchain_groq import ChatGroq
+                
                 llm = ChatGroq(
                     groq_api_key=groq_api_key,
                     model_name="llama-3.1-8b-instant",
@@ -1076,9 +1106,10 @@ def setup_qa_chain(_vectorstore, provider="Anthropic Claude (Cloud)"):
                     test_response = llm.invoke("Hello")
                     st.success("✅ Groq connection successful!")
                 except Exception as groq_error:
-                    if "rate limit" in str(groq_error).lower() or "quota" in str(groq_error).lower():
+                    error_text = str(groq_error).lower()
+                    if "rate limit" in error_text or "quota" in error_text:
                         st.error("❌ Groq rate limit exceeded. Please try again later or switch to another provider.")
-                    elif "unauthorized" in str(groq_error).lower() or "invalid" in str(groq_error).lower():
+                    elif "unauthorized" in error_text or "invalid" in error_text:
                         st.error("❌ Invalid Groq API key. Please check your API key.")
                     else:
                         st.error(f"❌ Groq connection error: {groq_error}")
@@ -1096,6 +1127,8 @@ def setup_qa_chain(_vectorstore, provider="Anthropic Claude (Cloud)"):
                     st.error("❌ Anthropic API key not found. Please add ANTHROPIC_API_KEY to Streamlit secrets.")
                     return None
                 
+                from langchain_anthropic import ChatAnthropic
+                
                 llm = ChatAnthropic(
                     anthropic_api_key=anthropic_api_key,
                     model_name="claude-3-5-haiku-20241022",  # Claude 3.5 Haiku - Fast and efficient
@@ -1108,9 +1141,10 @@ def setup_qa_chain(_vectorstore, provider="Anthropic Claude (Cloud)"):
                     test_response = llm.invoke("Hello")
 
                 except Exception as claude_error:
-                    if "rate limit" in str(claude_error).lower() or "quota" in str(claude_error).lower():
+                    error_text = str(claude_error).lower()
+                    if "rate limit" in error_text or "quota" in error_text:
                         st.error("❌ Anthropic rate limit exceeded. Please try again later or switch to another provider.")
-                    elif "unauthorized" in str(claude_error).lower() or "invalid" in str(claude_error).lower():
+                    elif "unauthorized" in error_text or "invalid" in error_text:
                         st.error("❌ Invalid Anthropic API key. Please check your API key.")
                     else:
                         st.error(f"❌ Anthropic Claude connection error: {claude_error}")
@@ -1123,6 +1157,8 @@ def setup_qa_chain(_vectorstore, provider="Anthropic Claude (Cloud)"):
         else:
             # Initialize Ollama LLM (fallback)
             try:
+                from langchain_ollama import OllamaLLM
+                
                 llm = OllamaLLM(
                     model="llama3:8b",  # Using the available model
                     temperature=0.1,
@@ -1244,83 +1280,104 @@ Answer:"""
             "method": f"Direct {provider}"
         }
 
+# Topic-based follow-up questions, checked in order against the answer and question
+FOLLOW_UP_QUESTIONS = {
+    "analysis workspace": [
+        "How do I export data from Analysis Workspace?",
+        "How can I schedule Analysis Workspace reports?",
+        "What are the different visualization types in Analysis Workspace?",
+        "How do I create calculated metrics in Analysis Workspace?",
+        "How do I share Analysis Workspace projects?"
+    ],
+    "calculated metrics": [
+        "How do I create calculated metrics?",
+        "What are the different types of calculated metrics?",
+        "How do I use calculated metrics in segments?",
+        "How do I share calculated metrics with my team?",
+        "What are the best practices for calculated metrics?"
+    ],
+    "segmentation": [
+        "How do I create segments in Adobe Analytics?",
+        "What are the different segment types?",
+        "How do I use segments in Analysis Workspace?",
+        "How do I share segments with my team?",
+        "What are the segment comparison features?"
+    ],
+    "implementation": [
+        "How do I implement Adobe Analytics tracking?",
+        "What are the required implementation variables?",
+        "How do I validate my implementation?",
+        "How do I set up e-commerce tracking?",
+        "What are the best practices for implementation?"
+    ],
+    "export": [
+        "How do I export data from Adobe Analytics?",
+        "How do I schedule automated exports?",
+        "How do I export Analysis Workspace projects?",
+        "What are the export limitations?"
+    ],
+    "admin": [
+        "How do I manage user permissions in Adobe Analytics?",
+        "How do I set up data governance?",
+        "How do I configure report suites?",
+        "How do I manage calculated metrics at admin level?",
+        "What are the admin best practices?"
+    ],
+    "integration": [
+        "How do I integrate Adobe Analytics with other tools?",
+        "How do I connect to Adobe Experience Platform?",
+        "How do I set up data connectors?",
+        "How do I integrate with Google Analytics?",
+        "What are the available API integrations?"
+    ]
+}
+
+# Fallback follow-up questions when no specific topic is found
+GENERAL_FOLLOW_UP_QUESTIONS = [
+    "How do I export data from this feature?",
+    "What are the best practices for this functionality?",
+    "How do I share this with my team?",
+    "What are the limitations of this feature?",
+    "How do I customize this for my needs?"
+]
+
+_WORD_RE = re.compile(r"\w+")
+
+def _tokenize(text):
+    """Split already-lowercased text into a set of words"""
+    return set(_WORD_RE.findall(text))
+
+# Lowercased word sets of each follow-up question, computed once at import
+_FOLLOW_UP_QUESTION_WORDS = {
+    topic: [_tokenize(question.lower()) for question in questions]
+    for topic, questions in FOLLOW_UP_QUESTIONS.items()
+}
+
 def generate_follow_up_questions(answer, original_question):
     """Generate relevant follow-up questions based on the answer content and original question"""
     
-    # Define topic-based follow-up questions
-    follow_up_mapping = {
-        "analysis workspace": [
-            "How do I export data from Analysis Workspace?",
-            "How can I schedule Analysis Workspace reports?",
-            "What are the different visualization types in Analysis Workspace?",
-            "How do I create calculated metrics in Analysis Workspace?",
-            "How do I share Analysis Workspace projects?"
-        ],
-        "calculated metrics": [
-            "How do I create calculated metrics?",
-            "What are the different types of calculated metrics?",
-            "How do I use calculated metrics in segments?",
-            "How do I share calculated metrics with my team?",
-            "What are the best practices for calculated metrics?"
-        ],
-        "segmentation": [
-            "How do I create segments in Adobe Analytics?",
-            "What are the different segment types?",
-            "How do I use segments in Analysis Workspace?",
-            "How do I share segments with my team?",
-            "What are the segment comparison features?"
-        ],
-        "implementation": [
-            "How do I implement Adobe Analytics tracking?",
-            "What are the required implementation variables?",
-            "How do I validate my implementation?",
-            "How do I set up e-commerce tracking?",
-            "What are the best practices for implementation?"
-        ],
-        "export": [
-            "How do I export data from Adobe Analytics?",
-            "How do I schedule automated exports?",
-            "How do I export Analysis Workspace projects?",
-            "What are the export limitations?"
-        ],
-        "admin": [
-            "How do I manage user permissions in Adobe Analytics?",
-            "How do I set up data governance?",
-            "How do I configure report suites?",
-            "How do I manage calculated metrics at admin level?",
-            "What are the admin best practices?"
-        ],
-        "integration": [
-            "How do I integrate Adobe Analytics with other tools?",
-            "How do I connect to Adobe Experience Platform?",
-            "How do I set up data connectors?",
-            "How do I integrate with Google Analytics?",
-            "What are the available API integrations?"
-        ]
-    }
-    
     # Convert to lowercase for matching
     answer_lower = answer.lower()
     question_lower = original_question.lower()
     
-    # Find relevant topics based on content
-    relevant_topics = []
-    
-    for topic, questions in follow_up_mapping.items():
-        if topic in answer_lower or topic in question_lower:
-            relevant_topics.append(topic)
+    # Find the first topic mentioned in the content
+    primary_topic = next(
+        (topic for topic in FOLLOW_UP_QUESTIONS
+         if topic in answer_lower or topic in question_lower),
+        None
+    )
     
     # Always return some questions - either topic-specific or general
-    if relevant_topics:
+    if primary_topic:
         # Get questions for the most relevant topic
-        primary_topic = relevant_topics[0]
-        questions = follow_up_mapping[primary_topic]
+        questions = FOLLOW_UP_QUESTIONS[primary_topic]
         
         # Filter out questions that might be too similar to the original question
+        question_words = _tokenize(question_lower)
         filtered_questions = []
-        for question in questions:
+        for question, words in zip(questions, _FOLLOW_UP_QUESTION_WORDS[primary_topic]):
             # Check if the question is too similar to the original
-            similarity_score = sum(word in question_lower for word in question.lower().split())
+            similarity_score = len(words & question_words)
             if similarity_score < 4:  # Increased threshold to be less restrictive
                 filtered_questions.append(question)
         
@@ -1331,14 +1388,7 @@ def generate_follow_up_questions(answer, original_question):
         return filtered_questions[:4]  # Return up to 4 relevant questions
     else:
         # Use general questions if no specific topics found
-        general_questions = [
-            "How do I export data from this feature?",
-            "What are the best practices for this functionality?",
-            "How do I share this with my team?",
-            "What are the limitations of this feature?",
-            "How do I customize this for my needs?"
-        ]
-        return general_questions[:4]  # Return 4 general questions
+        return GENERAL_FOLLOW_UP_QUESTIONS[:4]  # Return 4 general questions
 
 def handle_segment_creation_workflow(prompt, action_details):
     """
@@ -1570,6 +1620,41 @@ def render_segment_creation_workflow():
                     st.rerun()
 
 
+def _render_geographic_rule(rule):
+    """Show the target and variable of a geographic rule"""
+    st.write(f"**Target:** {rule.get('val', 'Unknown')}")
+    st.write(f"**Variable:** {rule.get('name', 'Unknown')}")
+
+def _render_device_rule(rule):
+    """Show the device and eVar of a device rule"""
+    st.write(f"**Device:** {rule.get('val', 'Unknown')}")
+    st.write(f"**eVar:** {rule.get('name', 'Unknown')}")
+
+def _render_behavioral_rule(rule):
+    """Show the threshold/metric or event of a behavioral rule"""
+    func = rule.get('func')
+    if func == 'gt':
+        st.write(f"**Threshold:** {rule.get('val', 'Unknown')}")
+        st.write(f"**Metric:** {rule.get('name', 'Unknown')}")
+    elif func == 'event-exists':
+        evt = rule.get('evt')
+        st.write(f"**Event:** {evt.get('name', 'Unknown') if evt else 'Unknown'}")
+
+def _render_time_based_rule(rule):
+    """Show the values and variable of a time-based rule"""
+    if rule.get('func') == 'streq-in':
+        st.write(f"**Values:** {', '.join(rule.get('list', []))}")
+        st.write(f"**Variable:** {rule.get('name', 'Unknown')}")
+
+# Detail renderer for each rule type in the fallback live preview
+_RULE_PREVIEW_RENDERERS = {
+    'geographic': _render_geographic_rule,
+    'device': _render_device_rule,
+    'behavioral': _render_behavioral_rule,
+    'time_based': _render_time_based_rule,
+}
+
+
 def render_segment_builder_workflow():
     """Render the segment builder workflow within the main app."""
     
@@ -1589,6 +1674,10 @@ def render_segment_builder_workflow():
     
     intent_data = st.session_state.segment_intent
     
+    # Resolve nested sections once per render instead of per widget
+    action_details = intent_data.get('action_details', {})
+    suggestions = intent_data.get('suggestions', {})
+    
     # Display segment definition first (if available from Claude)
     if intent_data.get('definition') and intent_data.get('claude_enhanced'):
         st.subheader("📖 Segment Definition")
@@ -1635,23 +1724,23 @@ def render_segment_builder_workflow():
     col1, col2 = st.columns(2)
     
     with col1:
-        st.metric("Target Audience", intent_data.get('action_details', {}).get('target_audience', 'visitors').title())
-        if intent_data.get('action_details', {}).get('device'):
-            st.metric("Device Type", intent_data.get('action_details', {})['device'].title())
-        if intent_data.get('action_details', {}).get('complexity'):
-            st.metric("Complexity", intent_data.get('action_details', {})['complexity'].title())
+        st.metric("Target Audience", action_details.get('target_audience', 'visitors').title())
+        if action_details.get('device'):
+            st.metric("Device Type", action_details['device'].title())
+        if action_details.get('complexity'):
+            st.metric("Complexity", action_details['complexity'].title())
     
     with col2:
-        if intent_data.get('action_details', {}).get('geographic'):
-            st.metric("Geographic", intent_data.get('action_details', {})['geographic'].title())
-        if intent_data.get('action_details', {}).get('time_based'):
-            st.metric("Time-based", intent_data.get('action_details', {})['time_based'].replace('_', ' ').title())
-        if intent_data.get('action_details', {}).get('intent_confidence'):
-            st.metric("Confidence", intent_data.get('action_details', {})['intent_confidence'].title())
+        if action_details.get('geographic'):
+            st.metric("Geographic", action_details['geographic'].title())
+        if action_details.get('time_based'):
+            st.metric("Time-based", action_details['time_based'].replace('_', ' ').title())
+        if action_details.get('intent_confidence'):
+            st.metric("Confidence", action_details['intent_confidence'].title())
     
     # Display Claude's enhanced analysis if available
     if intent_data.get('claude_enhanced'):
-        enhanced_details = intent_data.get('action_details', {})
+        enhanced_details = action_details
         
         if enhanced_details.get('business_context'):
             st.markdown("**🎯 Business Context:**")
@@ -1683,11 +1772,11 @@ def render_segment_builder_workflow():
         st.markdown("---")
     
     # Display relevant examples from vector database
-    if 'relevant_examples' in intent_data.get('suggestions', {}) and intent_data.get('suggestions', {}).get('relevant_examples'):
+    if suggestions.get('relevant_examples'):
         st.subheader("📚 Relevant Segment Examples")
         st.info("Based on your request, here are some relevant segment examples from our database:")
         
-        for i, example in enumerate(intent_data.get('suggestions', {}).get('relevant_examples', [])):
+        for i, example in enumerate(suggestions.get('relevant_examples', [])):
             with st.expander(f"📋 {example.get('name', 'Example Segment')}", expanded=False):
                 col1, col2 = st.columns([2, 1])
                 with col1:
@@ -1710,12 +1799,10 @@ def render_segment_builder_workflow():
                 }, indent=2), language="json")
     
     # Display enhanced suggestions if available
-    if intent_data.get('suggestions', {}).get('claude_enhanced'):
+    if suggestions.get('claude_enhanced'):
         st.subheader("🧠 Enhanced Suggestions")
         st.success("✨ Powered by Anthropic Claude for intelligent segment recommendations")
         
-        suggestions = intent_data.get('suggestions', {})
-        
         # Show alternative configurations
         if suggestions.get('alternative_configurations'):
             st.markdown("**🔄 Alternative Configurations:**")
@@ -1835,7 +1922,7 @@ def render_segment_builder_workflow():
     # Basic information with real-time validation
     segment_name = st.text_input(
         "Segment Name",
-        value=intent_data.get('suggestions', {}).get('segment_name', 'New Segment'),
+        value=suggestions.get('segment_name', 'New Segment'),
         help="Enter a descriptive name for your segment",
         key="app_segment_name_input"
     )
@@ -1848,7 +1935,7 @@ def render_segment_builder_workflow():
     
     segment_description = st.text_area(
         "Description",
-        value=intent_data.get('suggestions', {}).get('segment_description', ''),
+        value=suggestions.get('segment_description', ''),
         help="Describe what this segment targets",
         key="app_segment_description_input"
     )
@@ -1879,7 +1966,7 @@ def render_segment_builder_workflow():
     st.info("Configure the rules that define your segment")
     
     # Dynamic rule configuration based on detected intent
-    intent_details = intent_data.get('action_details', {})
+    intent_details = action_details
     configured_rules = []
     
     # Geographic rule configuration
@@ -2226,77 +2313,64 @@ def render_segment_builder_workflow():
                         st.write(f"**Function:** {rule.get('func', 'Unknown')}")
                     
                     with col2:
-                        if rule.get('type') == 'geographic':
-                            st.write(f"**Target:** {rule.get('val', 'Unknown')}")
-                            st.write(f"**Variable:** {rule.get('name', 'Unknown')}")
-                        elif rule.get('type') == 'device':
-                            st.write(f"**Device:** {rule.get('val', 'Unknown')}")
-                            st.write(f"**eVar:** {rule.get('name', 'Unknown')}")
-                        elif rule.get('type') == 'behavioral':
-                            if rule.get('func') == 'gt':
-                                st.write(f"**Threshold:** {rule.get('val', 'Unknown')}")
-                                st.write(f"**Metric:** {rule.get('name', 'Unknown')}")
-                            elif rule.get('func') == 'event-exists':
-                                st.write(f"**Event:** {rule.get('evt', {}).get('name', 'Unknown')}")
-                        elif rule.get('type') == 'time_based':
-                            if rule.get('func') == 'streq-in':
-                                st.write(f"**Values:** {', '.join(rule.get('list', []))}")
-                                st.write(f"**Variable:** {rule.get('name', 'Unknown')}")
+                        renderer = _RULE_PREVIEW_RENDERERS.get(rule.get('type'))
+                        if renderer:
+                            renderer(rule)
                         
                         # Show the raw rule structure in a collapsible section
                         with st.expander("📋 Raw Rule Structure", expanded=False):
                             st.json(rule)
                 
-                # Summary of all rules
-                st.success(f"✅ **{len(configured_rules)} rules configured successfully!**")
-                
-                # Show what the segment will target
-                st.write("**🎯 This segment will target:**")
-                targeting_summary = []
-                for rule in configured_rules:
-                    targeting_summary.append(rule.get('description', 'Custom rule'))
-                
-                for summary in targeting_summary:
-                    st.write(f"• {summary}")
+            # Summary of all rules
+            st.success(f"✅ **{len(configured_rules)} rules configured successfully!**")
+            
+            # Show what the segment will target
+            st.write("**🎯 This segment will target:**")
+            targeting_summary = []
+            for rule in configured_rules:
+                targeting_summary.append(rule.get('description', 'Custom rule'))
+            
+            for summary in targeting_summary:
+                st.write(f"• {summary}")
+            
+            # Preview Adobe Analytics format
+            st.subheader("🔍 Adobe Analytics Format Preview")
+            st.info("This is how your segment will be structured when sent to Adobe Analytics:")
+            
+            try:
+                adobe_definition = transform_rules_to_adobe_format(configured_rules, target_audience)
+                adobe_payload = {
+                    "name": segment_name,
+                    "description": segment_description,
+                    "rsid": rsid,
+                    "definition": adobe_definition
+                }
                 
-                # Preview Adobe Analytics format
-                st.subheader("🔍 Adobe Analytics Format Preview")
-                st.info("This is how your segment will be structured when sent to Adobe Analytics:")
+                # Show the Adobe Analytics format
+                st.json(adobe_payload)
                 
-                try:
-                    adobe_definition = transform_rules_to_adobe_format(configured_rules, target_audience)
-                    adobe_payload = {
-                        "name": segment_name,
-                        "description": segment_description,
-                        "rsid": rsid,
-                        "definition": adobe_definition
-                    }
-                    
-                    # Show the Adobe Analytics format
-                    st.json(adobe_payload)
+                # Explain the structure
+                with st.expander("📚 Understanding Adobe Analytics Format", expanded=False):
+                    st.write("""
+                    **Adobe Analytics Segment Structure:**
                     
-                    # Explain the structure
-                    with st.expander("📚 Understanding Adobe Analytics Format", expanded=False):
-                        st.write("""
-                        **Adobe Analytics Segment Structure:**
-                        
-                        - **version**: Segment definition version
-                        - **func**: Function type (always 'segment')
-                        - **container**: Contains the segment logic
-                        - **context**: Target audience (visitors, visits, hits)
-                        - **pred**: Predicate defining the segment conditions
-                        - **func**: Comparison function (streq, gt, event-exists, etc.)
-                        - **val**: Value object with attribute function
-                        - **name**: Variable name (e.g., variables/geocountry)
-                        - **str**: String value for comparison
-                        """)
-                        
-                except Exception as e:
-                    st.error(f"Could not generate Adobe Analytics format preview: {str(e)}")
+                    - **version**: Segment definition version
+                    - **func**: Function type (always 'segment')
+                    - **container**: Contains the segment logic
+                    - **context**: Target audience (visitors, visits, hits)
+                    - **pred**: Predicate defining the segment conditions
+                    - **func**: Comparison function (streq, gt, event-exists, etc.)
+                    - **val**: Value object with attribute function
+                    - **name**: Variable name (e.g., variables/geocountry)
+                    - **str**: String value for comparison
+                    """)
                     
-            else:
-                st.warning("⚠️ **No rules configured yet.** Please fill in the fields above to see live updates.")
-                st.info("💡 **Tip:** As you fill in the fields above, the configured rules will appear here automatically!")
+            except Exception as e:
+                st.error(f"Could not generate Adobe Analytics format preview: {str(e)}")
+                
+        else:
+            st.warning("⚠️ **No rules configured yet.** Please fill in the fields above to see live updates.")
+            st.info("💡 **Tip:** As you fill in the fields above, the configured rules will appear here automatically!")
     
     # Create segment button with enhanced validation
     if configured_rules:
@@ -2704,7 +2778,7 @@ def main():
                                 # Generate attributions for all sources
                                 if SOURCE_ATTRIBUTION_AVAILABLE and sources:
                                     try:
-                                        attributor = SourceAttributor()
+                                        attributor = get_source_attributor()
                                         attributions = attributor.generate_bulk_attribution(sources, "markdown")
                                         
                                         # Show attribution summary
@@ -2785,7 +2859,7 @@ def main():
                                         unique_key = f"attribution_report_{message_idx}_{timestamp}"
                                         if st.button("📊 Generate Attribution Report", key=unique_key):
                                             try:
-                                                json_report = attributor.export_attribution_report(attributions, "json")
+                                                json_report = attributor.export_attribution_report(attributions, "json", pretty=True)
                                                 markdown_report = attributor.export_attribution_report(attributions, "markdown")
                                                 
                                                 # Display reports in tabs
@@ -2843,7 +2917,6 @@ def main():
                                 
                                 for doc in response["source_documents"]:
                                     # Extract URLs from document content
-                                    import re
                                     urls = re.findall(r'https?://[^\s<>"]+', doc.page_content)
                                     
                                     for url in urls:
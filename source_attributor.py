@@ -11,17 +11,24 @@ License: MIT
 
 import re
 import json
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 from typing import Dict, List, Optional, Union, Tuple
 from enum import Enum
-from urllib.parse import urlparse, parse_qs
 import logging
-from datetime import datetime
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
+# Upper bound on each per-instance source lookup cache before it is reset
+_MAX_CACHED_SOURCES = 4096
+
+# Maps filename word separators to spaces when building titles
+_TITLE_SEPARATORS = str.maketrans('_-', '  ')
+
 
 class SourceType(Enum):
     """Enumeration of supported source types"""
@@ -38,7 +45,7 @@ class LicenseType(Enum):
     UNKNOWN = "Unknown"
 
 
-@dataclass
+@dataclass(slots=True)
 class SourceMetadata:
     """Data class for storing source metadata"""
     title: str
@@ -51,25 +58,28 @@ class SourceMetadata:
     description: Optional[str] = None
     tags: List[str] = field(default_factory=list)
     requires_attribution: bool = True
-    attribution_required_fields: List[str] = field(default_factory=list)
+    attribution_required_fields: Tuple[str, ...] = ()
+    # Plain-string copies of the enum values, read by the formatters and exporters
+    source_type_value: str = field(init=False, repr=False, compare=False)
+    license_type_value: str = field(init=False, repr=False, compare=False)
+    
+    # (license_type, requires_attribution, attribution_required_fields) per source type
+    _LICENSE_DEFAULTS = {
+        SourceType.STACK_OVERFLOW: (LicenseType.CC_BY_SA_4_0, True, ("title", "author", "url", "license_type")),
+        SourceType.ADOBE_DOCS: (LicenseType.ADOBE_PROPRIETARY, True, ("title", "url", "license_type"))
+    }
+    _DEFAULT_LICENSE = (LicenseType.UNKNOWN, False, ("title", "url"))
     
     def __post_init__(self):
         """Validate and set default values after initialization"""
-        if self.source_type == SourceType.STACK_OVERFLOW:
-            self.license_type = LicenseType.CC_BY_SA_4_0
-            self.requires_attribution = True
-            self.attribution_required_fields = ["title", "author", "url", "license_type"]
-        elif self.source_type == SourceType.ADOBE_DOCS:
-            self.license_type = LicenseType.ADOBE_PROPRIETARY
-            self.requires_attribution = True
-            self.attribution_required_fields = ["title", "url", "license_type"]
-        else:
-            self.license_type = LicenseType.UNKNOWN
-            self.requires_attribution = False
-            self.attribution_required_fields = ["title", "url"]
+        (self.license_type,
+         self.requires_attribution,
+         self.attribution_required_fields) = self._LICENSE_DEFAULTS.get(self.source_type, self._DEFAULT_LICENSE)
+        self.source_type_value = self.source_type.value
+        self.license_type_value = self.license_type.value
 
 
-@dataclass
+@dataclass(slots=True)
 class AttributionResult:
     """Data class for storing attribution results"""
     source_metadata: SourceMetadata
@@ -81,6 +91,25 @@ class AttributionResult:
     errors: List[str] = field(default_factory=list)
 
 
+def _copy_attribution(result: AttributionResult) -> AttributionResult:
+    """Copy an attribution result, giving it its own metadata and warning/error lists"""
+    return replace(
+        result,
+        source_metadata=replace(result.source_metadata, tags=list(result.source_metadata.tags)),
+        warnings=list(result.warnings),
+        errors=list(result.errors)
+    )
+
+
+# Placeholder metadata shared by every error result from generate_bulk_attribution
+_ERROR_METADATA = SourceMetadata(
+    title="Error Processing Source",
+    url="",
+    source_type=SourceType.UNKNOWN,
+    license_type=LicenseType.UNKNOWN
+)
+
+
 class SourceAttributor:
     """
     Comprehensive source attribution system for RAG chatbot responses.
@@ -95,6 +124,25 @@ class SourceAttributor:
         attribution_templates (Dict): Templates for different attribution formats
     """
     
+    # Experience Cloud knowledge-base article paths under en_docs_
+    _KCS_ARTICLE_RE = re.compile(r'^experience-cloud-kcs_kbarticles_(ka-[\w\-]+)(?:_(.*))?$')
+    
+    # en_docs_ sections that _handle_docs_prefix maps to their own URL path, keyed by
+    # the path's first underscore-delimited segment, with the section's base URL
+    _DOCS_SECTIONS = {
+        section: f"https://experienceleague.adobe.com/en/docs/{section}/"
+        for section in (
+            'analytics-platform',
+            'customer-journey-analytics-learn',
+            'analytics-learn',
+            'blueprints-learn',
+            'certification',
+            'release-notes',
+            'customer-journey-analytics',
+            'analytics'
+        )
+    }
+    
     def __init__(self):
         """Initialize the SourceAttributor with patterns and templates"""
         self.source_patterns = {
@@ -124,6 +172,26 @@ class SourceAttributor:
             ]
         }
         
+        # Lowercase substrings equivalent to source_patterns (every pattern there is a
+        # literal apart from http[s]?://), checked with plain `in` because a
+        # case-insensitive regex alternation is far slower on these short strings
+        self._source_markers = {
+            SourceType.STACK_OVERFLOW: ('stackoverflow', 'so:', 'stack overflow'),
+            SourceType.ADOBE_DOCS: ('adobe', 'en_docs_', 'en_browse_'),
+            SourceType.GENERIC_WEB: ('http://', 'https://', 'www.', '.com', '.org', '.net')
+        }
+        
+        # Top-level Adobe filename prefixes routed by _generate_adobe_url, mapped to
+        # (handler, whether the handler takes the legacy .html suffix)
+        self._adobe_prefix_handlers = {
+            'en_docs_': (self._handle_docs_prefix, True),
+            'en_browse_': (self._handle_browse_prefix, False),
+            'en_playlists_': (self._handle_playlists_prefix, False),
+            'en_perspectives_': (self._handle_perspectives_prefix, False),
+            'docs_': (self._handle_legacy_docs_prefix, True),
+            'browse_': (self._handle_browse_prefix, False)
+        }
+        
         self.license_requirements = {
             LicenseType.CC_BY_SA_4_0: {
                 "requires_attribution": True,
@@ -141,6 +209,13 @@ class SourceAttributor:
             }
         }
         
+        # Notice text per license type, resolved once rather than on every attribution
+        self._license_notices = {
+            license_type: info["notice"]
+            for license_type, info in self.license_requirements.items()
+            if "notice" in info
+        }
+        
         self.attribution_templates = {
             SourceType.STACK_OVERFLOW: {
                 "plain_text": "{title} by {author} on Stack Overflow ({license}) - {url}",
@@ -158,6 +233,20 @@ class SourceAttributor:
                 "detailed": "**Source:** {title}\n**URL:** {url}\n**License:** {license}"
             }
         }
+        
+        # Results of the pure per-source lookups, keyed by source string; the same
+        # retrieved documents come back across queries and bulk runs
+        self._source_type_cache: Dict[str, SourceType] = {}
+        self._title_cache: Dict[str, str] = {}
+        self._url_cache: Dict[Tuple[str, SourceType], str] = {}
+    
+    @staticmethod
+    def _remember(cache: Dict, key, value):
+        """Store a lookup result, resetting the cache once it reaches its size limit."""
+        if len(cache) >= _MAX_CACHED_SOURCES:
+            cache.clear()
+        cache[key] = value
+        return value
     
     def identify_source_type(self, source: str) -> SourceType:
         """
@@ -175,18 +264,22 @@ class SourceAttributor:
         if not source or not isinstance(source, str):
             raise ValueError("Source must be a non-empty string")
         
+        cached = self._source_type_cache.get(source)
+        if cached is not None:
+            return cached
+        
         source_lower = source.lower()
         
-        # Check each source type pattern
-        for source_type, patterns in self.source_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, source_lower, re.IGNORECASE):
-                    logger.info(f"Identified source type '{source_type.value}' for source: {source}")
-                    return source_type
+        # Check each source type's markers
+        for source_type, markers in self._source_markers.items():
+            for marker in markers:
+                if marker in source_lower:
+                    logger.debug("Identified source type '%s' for source: %s", source_type.value, source)
+                    return self._remember(self._source_type_cache, source, source_type)
         
         # Default to generic web if no specific pattern matches
         logger.warning(f"Could not identify source type for: {source}, defaulting to generic web")
-        return SourceType.GENERIC_WEB
+        return self._remember(self._source_type_cache, source, SourceType.GENERIC_WEB)
     
     def extract_metadata_from_source(self, source: str, additional_info: Optional[Dict] = None) -> SourceMetadata:
         """
@@ -231,7 +324,22 @@ class SourceAttributor:
     
     def _generate_title_from_source(self, source: str) -> str:
         """
-        Generate a human-readable title from source identifier.
+        Generate a human-readable title from source identifier, reusing earlier results.
+        
+        Args:
+            source (str): Source identifier or filename
+            
+        Returns:
+            str: Generated title
+        """
+        title = self._title_cache.get(source)
+        if title is None:
+            title = self._remember(self._title_cache, source, self._build_title_from_source(source))
+        return title
+    
+    def _build_title_from_source(self, source: str) -> str:
+        """
+        Build a human-readable title from source identifier.
         
         Args:
             source (str): Source identifier or filename
@@ -243,35 +351,20 @@ class SourceAttributor:
             return "Unknown Source"
         
         # Remove file extensions
-        title = source.replace('.txt', '').replace('.html', '')
+        title = source.removesuffix('.txt').removesuffix('.html')
         
         # Handle different naming conventions
         if title.startswith('stackoverflow_'):
             # Extract question ID and create title
-            parts = title.split('_')
-            if len(parts) >= 2:
-                try:
-                    question_id = parts[1]
-                    return f"Stack Overflow Question #{question_id}"
-                except:
-                    pass
-            return "Stack Overflow Question"
-        
-        elif title.startswith('en_docs_'):
-            # Clean up Adobe documentation titles
-            title = title.replace('en_docs_', '')
-            title = title.replace('_', ' ').title()
-            return title
-        
-        elif title.startswith('en_browse_'):
-            # Clean up Adobe browse page titles
-            title = title.replace('en_browse_', '')
-            title = title.replace('_', ' ').title()
-            return title
+            question_id = title.split('_', 2)[1]
+            return f"Stack Overflow Question #{question_id}"
+        
+        elif title.startswith(('en_docs_', 'en_browse_')):
+            # Clean up Adobe documentation and browse page titles
+            return title.split('_', 2)[2].replace('_', ' ').title()
         
         # Generic cleanup
-        title = title.replace('_', ' ').replace('-', ' ')
-        return title.title()
+        return title.translate(_TITLE_SEPARATORS).title()
     
     def generate_url_from_source(self, source: str) -> str:
         """
@@ -291,7 +384,24 @@ class SourceAttributor:
     
     def _generate_url_from_source(self, source: str, source_type: SourceType) -> str:
         """
-        Generate URL from source identifier based on source type.
+        Generate URL from source identifier based on source type, reusing earlier results.
+        
+        Args:
+            source (str): Source identifier
+            source_type (SourceType): Identified source type
+            
+        Returns:
+            str: Generated URL
+        """
+        key = (source, source_type)
+        url = self._url_cache.get(key)
+        if url is None:
+            url = self._remember(self._url_cache, key, self._build_url_from_source(source, source_type))
+        return url
+    
+    def _build_url_from_source(self, source: str, source_type: SourceType) -> str:
+        """
+        Build URL from source identifier based on source type.
         
         This method uses comprehensive Adobe URL generation logic for better
         support of complex Adobe documentation patterns including analytics-platform,
@@ -318,7 +428,7 @@ class SourceAttributor:
         
         elif source_type == SourceType.ADOBE_DOCS:
             # Use comprehensive Adobe URL generation logic
-            logger.debug(f"Using Adobe URL generation for source: {source}")
+            logger.debug("Using Adobe URL generation for source: %s", source)
             return self._generate_adobe_url(source)
         
         # Generic fallback
@@ -365,7 +475,7 @@ class SourceAttributor:
         if name_lower.endswith('.txt'):
             source_name = source_name[:-4]
         
-        logger.debug(f"Processing source name: {source_name}")
+        logger.debug("Processing source name: %s", source_name)
         
         # Handle legacy HTML suffix for docs_ prefixed files (case-insensitive)
         html_suffix = ""
@@ -373,23 +483,24 @@ class SourceAttributor:
             html_suffix = ".html"
             source_name = source_name[:-5]
         
-        # Prefix identification and routing
-        if source_name.startswith('en_docs_'):
-            return self._handle_docs_prefix(source_name[8:], html_suffix)
-        elif source_name.startswith('en_browse_'):
-            return self._handle_browse_prefix(source_name[10:])
-        elif source_name.startswith('en_playlists_'):
-            return self._handle_playlists_prefix(source_name[13:])
-        elif source_name.startswith('en_perspectives_'):
-            return self._handle_perspectives_prefix(source_name[16:])
-        elif source_name.startswith('docs_'):
-            return self._handle_legacy_docs_prefix(source_name[5:], html_suffix)
-        elif source_name.startswith('browse_'):
-            return self._handle_browse_prefix(source_name[7:])
+        # Prefix identification: the prefix is the first underscore-delimited
+        # token, or the first two when the name starts with the en_ locale
+        head, sep, path = source_name.partition('_')
+        if head == 'en' and sep:
+            section, sep, path = path.partition('_')
+            prefix = f"en_{section}_"
         else:
-            # No prefix detected, try intelligent fallback
-            logger.debug(f"No prefix detected for {source_name}, using intelligent fallback")
-            return self._intelligent_fallback(source_name, html_suffix)
+            prefix = f"{head}_"
+        
+        # Routing
+        route = self._adobe_prefix_handlers.get(prefix) if sep else None
+        if route:
+            handler, takes_html_suffix = route
+            return handler(path, html_suffix) if takes_html_suffix else handler(path)
+        
+        # No prefix detected, try intelligent fallback
+        logger.debug("No prefix detected for %s, using intelligent fallback", source_name)
+        return self._intelligent_fallback(source_name, html_suffix, name_lower)
     
     def _handle_docs_prefix(self, path: str, html_suffix: str = "") -> str:
         """
@@ -406,74 +517,32 @@ class SourceAttributor:
         
         # Special cases for complex nested paths
         # Use regex to capture the ka- ID and optionally append remaining segments
-        m = re.match(r'^experience-cloud-kcs_kbarticles_(ka-[\w\-]+)(?:_(.*))?$', path)
-        if m:
-            kb_id = m.group(1)
-            if m.group(2):
-                # Convert remaining segments to path format
-                converted_remainder = self._convert_underscores_to_path(m.group(2))
-                return f"https://experienceleague.adobe.com/en/docs/experience-cloud-kcs/kbarticles/{kb_id}/{converted_remainder}{html_suffix}"
-            else:
-                return f"https://experienceleague.adobe.com/en/docs/experience-cloud-kcs/kbarticles/{kb_id}{html_suffix}"
-        
-        elif path.startswith('analytics-platform_'):
-            # Handle analytics-platform paths
-            clean_path = path.replace('analytics-platform_', '')
-            url_path = self._convert_underscores_to_path(clean_path)
-            return f"{base_url}/analytics-platform/{url_path}{html_suffix}"
-        
-        elif path.startswith('customer-journey-analytics-learn_'):
-            # Handle customer-journey-analytics-learn paths
-            clean_path = path.replace('customer-journey-analytics-learn_', '')
-            url_path = self._convert_underscores_to_path(clean_path)
-            return f"{base_url}/customer-journey-analytics-learn/{url_path}{html_suffix}"
-        
-        elif path.startswith('analytics-learn_'):
-            # Handle analytics-learn paths
-            clean_path = path.replace('analytics-learn_', '')
-            url_path = self._convert_underscores_to_path(clean_path)
-            return f"{base_url}/analytics-learn/{url_path}{html_suffix}"
-        
-        elif path.startswith('blueprints-learn_'):
-            # Handle blueprints-learn paths
-            clean_path = path.replace('blueprints-learn_', '')
-            url_path = self._convert_underscores_to_path(clean_path)
-            return f"{base_url}/blueprints-learn/{url_path}{html_suffix}"
-        
-        elif path.startswith('certification_'):
-            # Handle certification paths
-            clean_path = path.replace('certification_', '')
-            url_path = self._convert_underscores_to_path(clean_path)
-            return f"{base_url}/certification/{url_path}{html_suffix}"
-        
-        elif path.startswith('release-notes_'):
-            # Handle release-notes paths
-            clean_path = path.replace('release-notes_', '')
-            url_path = self._convert_underscores_to_path(clean_path)
-            return f"{base_url}/release-notes/{url_path}{html_suffix}"
-        
-        elif path.startswith('customer_journey_analytics_'):
-            # Handle underscore variant customer_journey_analytics paths
-            clean = path[len('customer_journey_analytics_'):]
-            url_path = self._convert_underscores_to_path(clean)
-            return f"https://experienceleague.adobe.com/en/docs/customer-journey-analytics/{url_path}{html_suffix}"
-        
-        elif path.startswith('customer-journey-analytics_'):
-            # Handle hyphen variant customer-journey-analytics paths
-            clean = path[len('customer-journey-analytics_'):]
-            url_path = self._convert_underscores_to_path(clean)
-            return f"https://experienceleague.adobe.com/en/docs/customer-journey-analytics/{url_path}{html_suffix}"
-        
-        elif path.startswith('analytics_'):
-            # Handle generic analytics paths
-            clean_path = path.replace('analytics_', '')
-            url_path = self._convert_underscores_to_path(clean_path)
-            return f"{base_url}/analytics/{url_path}{html_suffix}"
+        if path.startswith('experience-cloud-kcs_kbarticles_'):
+            m = self._KCS_ARTICLE_RE.match(path)
+            if m:
+                kb_id = m.group(1)
+                if m.group(2):
+                    # Convert remaining segments to path format
+                    converted_remainder = self._convert_underscores_to_path(m.group(2))
+                    return f"https://experienceleague.adobe.com/en/docs/experience-cloud-kcs/kbarticles/{kb_id}/{converted_remainder}{html_suffix}"
+                else:
+                    return f"https://experienceleague.adobe.com/en/docs/experience-cloud-kcs/kbarticles/{kb_id}{html_suffix}"
         
+        # Known sections are identified by their first path segment; the underscore variant of
+        # customer-journey-analytics spans several segments so it is matched first
+        if path.startswith('customer_journey_analytics_'):
+            section_url = self._DOCS_SECTIONS['customer-journey-analytics']
+            rest = path[len('customer_journey_analytics_'):]
         else:
-            # Generic path construction for docs
-            url_path = self._convert_underscores_to_path(path)
-            return f"{base_url}/{url_path}{html_suffix}"
+            section, sep, rest = path.partition('_')
+            section_url = self._DOCS_SECTIONS.get(section) if sep else None
+        
+        if section_url:
+            return section_url + self._convert_underscores_to_path(rest) + html_suffix
+        
+        # Generic path construction for docs
+        url_path = self._convert_underscores_to_path(path)
+        return f"{base_url}/{url_path}{html_suffix}"
     
     def _handle_browse_prefix(self, path: str) -> str:
         """
@@ -545,37 +614,45 @@ class SourceAttributor:
         if not path:
             return ""
         
+        # Without doubled, leading or trailing underscores there are no empty
+        # segments, so a single replace gives the same result as split/join
+        if '__' not in path and path[0] != '_' and path[-1] != '_':
+            return path.replace('_', '/')
+        
         # Split on underscores and join with forward slashes
         # This preserves hyphens within each segment
         # Filter out empty segments to handle consecutive underscores
-        segments = [s for s in path.split('_') if s]
-        return '/'.join(segments)
+        return '/'.join(filter(None, path.split('_')))
     
-    def _intelligent_fallback(self, source_name: str, html_suffix: str = "") -> str:
+    def _intelligent_fallback(self, source_name: str, html_suffix: str = "",
+                              name_lower: Optional[str] = None) -> str:
         """
         Intelligent fallback when no prefix is detected.
         
         Args:
             source_name (str): Source name without prefix
             html_suffix (str): HTML suffix if present
+            name_lower (Optional[str]): Already-lowercased source name, with or without
+                its extension, if the caller has one
             
         Returns:
             str: Generated URL using intelligent fallback
         """
-        logger.debug(f"Using intelligent fallback for: {source_name}")
+        logger.debug("Using intelligent fallback for: %s", source_name)
         
         # Convert underscores to forward slashes
         url_path = self._convert_underscores_to_path(source_name)
         
         # Try to determine the most appropriate base URL based on content
-        # Prioritize Customer Journey Analytics before generic Analytics
-        name = source_name.lower()
-        if 'customer-journey-analytics' in name or 'customer_journey_analytics' in name:
+        # Prioritize Customer Journey Analytics before generic Analytics; both CJA
+        # spellings contain 'analytics', so names without it need only one scan
+        name = name_lower if name_lower is not None else source_name.lower()
+        if 'analytics' not in name:
+            base_url = 'https://experienceleague.adobe.com/en/docs'
+        elif 'customer-journey-analytics' in name or 'customer_journey_analytics' in name:
             base_url = 'https://experienceleague.adobe.com/en/docs/customer-journey-analytics'
-        elif 'analytics' in name:
-            base_url = 'https://experienceleague.adobe.com/en/docs/analytics'
         else:
-            base_url = 'https://experienceleague.adobe.com/en/docs'
+            base_url = 'https://experienceleague.adobe.com/en/docs/analytics'
         
         return f"{base_url}/{url_path}{html_suffix}"
     
@@ -602,9 +679,16 @@ class SourceAttributor:
             if not template:
                 raise ValueError(f"No attribution template found for source type: {source_metadata.source_type}")
             
-            # Generate attribution text
-            attribution_text = self._format_attribution(template.get(format_type, template["plain_text"]), source_metadata)
-            attribution_markdown = self._format_attribution(template.get(format_type, template.get("markdown", template["plain_text"])), source_metadata)
+            # Generate attribution text; both outputs share one template unless
+            # format_type is unknown, in which case they fall back separately
+            text_template = template.get(format_type, template["plain_text"])
+            markdown_template = template.get(format_type, template.get("markdown", template["plain_text"]))
+            format_vars = self._attribution_format_vars(source_metadata)
+            attribution_text = self._format_attribution(text_template, source_metadata, format_vars)
+            if markdown_template is text_template:
+                attribution_markdown = attribution_text
+            else:
+                attribution_markdown = self._format_attribution(markdown_template, source_metadata, format_vars)
             
             # Generate license notice if required
             license_notice = None
@@ -625,31 +709,47 @@ class SourceAttributor:
             logger.error(f"Failed to generate attribution for source '{source_metadata.title}': {str(e)}")
             raise ValueError(f"Attribution generation failed: {str(e)}")
     
-    def _format_attribution(self, template: str, metadata: SourceMetadata) -> str:
+    def _attribution_format_vars(self, metadata: SourceMetadata) -> Dict[str, str]:
         """
-        Format attribution using template and metadata.
+        Build the template variables for a source's attribution.
         
         Args:
-            template (str): Attribution template string
             metadata (SourceMetadata): Source metadata
             
         Returns:
-            str: Formatted attribution text
+            Dict[str, str]: Values for the attribution template placeholders
         """
-        # Prepare formatting variables
-        format_vars = {
+        license_value = metadata.license_type_value
+        return {
             "title": metadata.title,
             "url": metadata.url,
             "author": metadata.author or "Unknown Author",
-            "license": metadata.license_type.value,
-            "license_type": metadata.license_type.value,
-            "source_type": metadata.source_type.value,
+            "license": license_value,
+            "license_type": license_value,
+            "source_type": metadata.source_type_value,
             "date": metadata.publication_date or "Unknown Date"
         }
+    
+    def _format_attribution(self, template: str, metadata: SourceMetadata,
+                            format_vars: Optional[Dict[str, str]] = None) -> str:
+        """
+        Format attribution using template and metadata.
+        
+        Args:
+            template (str): Attribution template string
+            metadata (SourceMetadata): Source metadata
+            format_vars (Optional[Dict[str, str]]): Precomputed template variables
+            
+        Returns:
+            str: Formatted attribution text
+        """
+        # Prepare formatting variables
+        if format_vars is None:
+            format_vars = self._attribution_format_vars(metadata)
         
         # Format the template
         try:
-            return template.format(**format_vars)
+            return template.format_map(format_vars)
         except KeyError as e:
             logger.warning(f"Template formatting failed for key {e}, using fallback")
             return f"{metadata.title} - {metadata.url}"
@@ -703,8 +803,10 @@ class SourceAttributor:
         Returns:
             str: License notice text
         """
-        license_info = self.license_requirements.get(license_type, {})
-        return license_info.get("notice", f"License: {license_type.value}")
+        notice = self._license_notices.get(license_type)
+        if notice is None:
+            notice = f"License: {license_type.value}"
+        return notice
     
     def generate_bulk_attribution(self, sources: List[Union[str, SourceMetadata]], format_type: str = "plain_text") -> List[AttributionResult]:
         """
@@ -715,11 +817,18 @@ class SourceAttributor:
             format_type (str): Desired format type
             
         Returns:
-            List[AttributionResult]: List of attribution results
+            List[AttributionResult]: One independent attribution result per source
         """
         results = []
+        # Retrieved chunks often come from the same document, so each distinct
+        # source string is attributed once per batch and repeats get a copy
+        seen: Dict[str, AttributionResult] = {}
         
         for source in sources:
+            if isinstance(source, str) and source in seen:
+                results.append(_copy_attribution(seen[source]))
+                continue
+            
             try:
                 if isinstance(source, str):
                     metadata = self.extract_metadata_from_source(source)
@@ -727,41 +836,39 @@ class SourceAttributor:
                     metadata = source
                 
                 attribution = self.generate_attribution(metadata, format_type)
-                results.append(attribution)
                 
             except Exception as e:
                 logger.error(f"Failed to generate attribution for source: {str(e)}")
                 # Create error result
-                error_metadata = SourceMetadata(
-                    title="Error Processing Source",
-                    url="",
-                    source_type=SourceType.UNKNOWN,
-                    license_type=LicenseType.UNKNOWN
-                )
-                error_result = AttributionResult(
-                    source_metadata=error_metadata,
+                attribution = AttributionResult(
+                    source_metadata=_ERROR_METADATA,
                     attribution_text=f"Error: {str(e)}",
                     attribution_markdown=f"**Error:** {str(e)}",
                     compliance_status="error",
                     errors=[str(e)]
                 )
-                results.append(error_result)
+            
+            if isinstance(source, str):
+                seen[source] = attribution
+            results.append(attribution)
         
         return results
     
-    def export_attribution_report(self, attributions: List[AttributionResult], format_type: str = "json") -> str:
+    def export_attribution_report(self, attributions: List[AttributionResult], format_type: str = "json",
+                                  pretty: bool = False) -> str:
         """
         Export attribution results in various formats.
         
         Args:
             attributions (List[AttributionResult]): List of attribution results
             format_type (str): Export format (json, markdown, plain_text)
+            pretty (bool): Indent JSON output for human readers (json format only)
             
         Returns:
             str: Exported attribution report
         """
         if format_type == "json":
-            return self._export_json(attributions)
+            return self._export_json(attributions, pretty)
         elif format_type == "markdown":
             return self._export_markdown(attributions)
         elif format_type == "plain_text":
@@ -769,65 +876,79 @@ class SourceAttributor:
         else:
             raise ValueError(f"Unsupported export format: {format_type}")
     
-    def _export_json(self, attributions: List[AttributionResult]) -> str:
+    def _export_json(self, attributions: List[AttributionResult], pretty: bool = False) -> str:
         """Export attributions as JSON string"""
-        export_data = []
-        for attr in attributions:
-            export_data.append({
+        export_data = [
+            {
                 "title": attr.source_metadata.title,
                 "url": attr.source_metadata.url,
-                "source_type": attr.source_metadata.source_type.value,
-                "license": attr.source_metadata.license_type.value,
+                "source_type": attr.source_metadata.source_type_value,
+                "license": attr.source_metadata.license_type_value,
                 "attribution_text": attr.attribution_text,
                 "attribution_markdown": attr.attribution_markdown,
                 "compliance_status": attr.compliance_status,
                 "warnings": attr.warnings,
                 "errors": attr.errors
-            })
+            }
+            for attr in attributions
+        ]
         
-        return json.dumps(export_data, indent=2)
+        # orjson serializes in C; fall back to the stdlib when it is not installed
+        if orjson is not None:
+            if pretty:
+                return orjson.dumps(export_data, option=orjson.OPT_INDENT_2).decode()
+            return orjson.dumps(export_data).decode()
+        if pretty:
+            return json.dumps(export_data, indent=2)
+        return json.dumps(export_data, separators=(',', ':'))
     
     def _export_markdown(self, attributions: List[AttributionResult]) -> str:
         """Export attributions as Markdown string"""
-        markdown_lines = ["# Source Attribution Report", ""]
+        markdown_blocks = ["# Source Attribution Report", ""]
         
         for i, attr in enumerate(attributions, 1):
-            markdown_lines.append(f"## {i}. {attr.source_metadata.title}")
-            markdown_lines.append(f"**URL:** {attr.source_metadata.url}")
-            markdown_lines.append(f"**Source Type:** {attr.source_metadata.source_type.value}")
-            markdown_lines.append(f"**License:** {attr.source_metadata.license_type.value}")
-            markdown_lines.append(f"**Attribution:** {attr.attribution_markdown}")
-            markdown_lines.append(f"**Compliance:** {attr.compliance_status}")
+            metadata = attr.source_metadata
+            block = (
+                f"## {i}. {metadata.title}\n"
+                f"**URL:** {metadata.url}\n"
+                f"**Source Type:** {metadata.source_type_value}\n"
+                f"**License:** {metadata.license_type_value}\n"
+                f"**Attribution:** {attr.attribution_markdown}\n"
+                f"**Compliance:** {attr.compliance_status}\n"
+            )
             
             if attr.warnings:
-                markdown_lines.append(f"**Warnings:** {', '.join(attr.warnings)}")
+                block += f"**Warnings:** {', '.join(attr.warnings)}\n"
             if attr.errors:
-                markdown_lines.append(f"**Errors:** {', '.join(attr.errors)}")
+                block += f"**Errors:** {', '.join(attr.errors)}\n"
             
-            markdown_lines.append("")
+            markdown_blocks.append(block)
         
-        return "\n".join(markdown_lines)
+        return "\n".join(markdown_blocks)
     
     def _export_plain_text(self, attributions: List[AttributionResult]) -> str:
         """Export attributions as plain text string"""
-        text_lines = ["SOURCE ATTRIBUTION REPORT", "=" * 50, ""]
+        text_blocks = ["SOURCE ATTRIBUTION REPORT", "=" * 50, ""]
         
         for i, attr in enumerate(attributions, 1):
-            text_lines.append(f"{i}. {attr.source_metadata.title}")
-            text_lines.append(f"   URL: {attr.source_metadata.url}")
-            text_lines.append(f"   Source Type: {attr.source_metadata.source_type.value}")
-            text_lines.append(f"   License: {attr.source_metadata.license_type.value}")
-            text_lines.append(f"   Attribution: {attr.attribution_text}")
-            text_lines.append(f"   Compliance: {attr.compliance_status}")
+            metadata = attr.source_metadata
+            block = (
+                f"{i}. {metadata.title}\n"
+                f"   URL: {metadata.url}\n"
+                f"   Source Type: {metadata.source_type_value}\n"
+                f"   License: {metadata.license_type_value}\n"
+                f"   Attribution: {attr.attribution_text}\n"
+                f"   Compliance: {attr.compliance_status}\n"
+            )
             
             if attr.warnings:
-                text_lines.append(f"   Warnings: {', '.join(attr.warnings)}")
+                block += f"   Warnings: {', '.join(attr.warnings)}\n"
             if attr.errors:
-                text_lines.append(f"   Errors: {', '.join(attr.errors)}")
+                block += f"   Errors: {', '.join(attr.errors)}\n"
             
-            text_lines.append("")
+            text_blocks.append(block)
         
-        return "\n".join(text_lines)
+        return "\n".join(text_blocks)
 
 
 # Utility functions for easy integration
@@ -836,6 +957,10 @@ def create_source_attributor() -> SourceAttributor:
     return SourceAttributor()
 
 
+# Attributor reused by quick_attribution so its tables and caches persist between calls
+_default_attributor: Optional[SourceAttributor] = None
+
+
 def quick_attribution(source: str, format_type: str = "plain_text") -> str:
     """
     Quick attribution generation for a single source.
@@ -847,8 +972,11 @@ def quick_attribution(source: str, format_type: str = "plain_text") -> str:
     Returns:
         str: Attribution text
     """
+    global _default_attributor
     try:
-        attributor = SourceAttributor()
+        if _default_attributor is None:
+            _default_attributor = SourceAttributor()
+        attributor = _default_attributor
         metadata = attributor.extract_metadata_from_source(source)
         attribution = attributor.generate_attribution(metadata, format_type)
         return attribution.attribution_text
@@ -858,6 +986,9 @@ def quick_attribution(source: str, format_type: str = "plain_text") -> str:
 
 
 if __name__ == "__main__":
+    # Configure logging
+    logging.basicConfig(level=logging.INFO)
+    
     # Example usage and testing
     def test_source_attributor():
         """Test the SourceAttributor class functionality"""
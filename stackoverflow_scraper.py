@@ -5,32 +5,79 @@ Fetches Adobe-related questions and answers from Stack Overflow API
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+import html
 import json
 import time
 import os
+import shelve
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime, timedelta
+from urllib.parse import urlencode
 import re
-from typing import List, Dict, Any
+from collections import defaultdict
+from typing import List, Dict, Any, Optional, Set, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _json_loads(content: bytes) -> Any:
+    """Parse a JSON response body, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+# Patterns used by clean_text and create_safe_filename for every scraped post
+_TAG_RE = re.compile(r'<[^>]+>')
+_WS_RE = re.compile(r'\s+')
+_UNSAFE_RE = re.compile(r'[^\w\s-]')
+_DASH_RE = re.compile(r'[-\s]+')
+
 
 class StackOverflowScraper:
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, max_workers: int = 8, requests_per_second: float = 25.0):
         """
         Initialize Stack Overflow scraper
         
         Args:
             api_key: Stack Overflow API key (optional, but recommended for higher rate limits)
+            max_workers: Number of tags/terms searched concurrently
+            requests_per_second: Ceiling on API calls across all workers (StackExchange throttles at 30/s)
         """
         self.api_key = api_key
+        self.max_workers = max_workers
+        
+        # Shared throttle: each API call reserves the next free slot before it is sent
+        self._min_request_interval = 1.0 / requests_per_second
+        self._next_request_at = 0.0
+        self._rate_lock = threading.Lock()
         self.base_url = "https://api.stackexchange.com/2.3"
         self.headers = {
-            'User-Agent': 'Adobe-Documentation-Chatbot/1.0'
+            'User-Agent': 'Adobe-Documentation-Chatbot/1.0',
+            'Accept-Encoding': 'gzip'
         }
         
+        # Reuse one pooled connection to the API across all pages and batches
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_connections=8, pool_maxsize=32))
+        
         # Create stackoverflow_docs directory
         self.docs_path = Path("./stackoverflow_docs")
         self.docs_path.mkdir(exist_ok=True)
         
+        # ETag-validated response cache so unchanged pages are not re-downloaded; kept
+        # next to this module, outside docs_path, so it is neither ingested nor copied into backups
+        self.cache_path = Path(__file__).parent / ".stackoverflow_cache"
+        self.cache_path.mkdir(exist_ok=True)
+        self._cache: Optional[shelve.Shelf] = None
+        self._cache_lock = threading.Lock()
+        
         # Adobe-related tags to search for
         self.adobe_tags = [
             'adobe-analytics',
@@ -97,6 +144,82 @@ class StackOverflowScraper:
             'Adobe Analytics technotes'
         ]
 
+    def _wait_for_request_slot(self):
+        """Block until the shared rate limit allows another API call"""
+        with self._rate_lock:
+            now = time.monotonic()
+            slot = max(now, self._next_request_at)
+            self._next_request_at = slot + self._min_request_interval
+        
+        if slot > now:
+            time.sleep(slot - now)
+
+    def _response_cache_file(self) -> Path:
+        """Path of today's response shelf; search parameters change daily, so older shelves never hit"""
+        return self.cache_path / f"responses-{datetime.now():%Y%m%d}"
+
+    def _prune_response_cache(self):
+        """Delete response shelves from previous days"""
+        self._close_response_cache()
+        current = self._response_cache_file().name
+        with self._cache_lock:
+            for path in self.cache_path.glob("responses-*"):
+                if not path.name.startswith(current):
+                    path.unlink()
+
+    def _open_response_cache(self) -> shelve.Shelf:
+        """Return today's response shelf, opening it on first use; call with _cache_lock held"""
+        if self._cache is None:
+            self._cache = shelve.open(str(self._response_cache_file()))
+        return self._cache
+
+    def _close_response_cache(self):
+        """Flush and close the response shelf if it is open"""
+        with self._cache_lock:
+            if self._cache is not None:
+                self._cache.close()
+                self._cache = None
+
+    def _get_json(self, url: str, params: Dict[str, Any]) -> Dict:
+        """
+        GET an API endpoint and parse the JSON body, revalidating cached pages by ETag
+        
+        Args:
+            url: Endpoint URL
+            params: Query parameters
+            
+        Returns:
+            Parsed response data
+        """
+        key = f"{url}?{urlencode(sorted(params.items()))}"
+        with self._cache_lock:
+            cached = self._open_response_cache().get(key)
+        
+        headers = self.headers
+        if cached:
+            headers = {**headers, 'If-None-Match': cached[0]}
+        
+        self._wait_for_request_slot()
+        response = self.session.get(url, params=params, headers=headers)
+        if cached and response.status_code == 304:
+            return _json_loads(cached[1])
+        response.raise_for_status()
+        
+        etag = response.headers.get('ETag')
+        if etag:
+            with self._cache_lock:
+                self._open_response_cache()[key] = (etag, response.content)
+        
+        data = _json_loads(response.content)
+        
+        # StackExchange asks clients to pause for `backoff` seconds; hold every worker off until then
+        backoff = data.get('backoff')
+        if backoff:
+            with self._rate_lock:
+                self._next_request_at = max(self._next_request_at, time.monotonic() + backoff)
+        
+        return data
+
     def search_questions(self, tag: str = None, search_term: str = None, days_back: int = 365) -> List[Dict]:
         """
         Search for questions on Stack Overflow
@@ -111,8 +234,10 @@ class StackOverflowScraper:
         """
         questions = []
         
-        # Calculate date range
-        from_date = int((datetime.now() - timedelta(days=days_back)).timestamp())
+        # Calculate date range, anchored at midnight so repeat runs on the same
+        # day send identical parameters and can revalidate cached pages
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        from_date = int((today - timedelta(days=days_back)).timestamp())
         
         # Build search parameters
         params = {
@@ -130,14 +255,7 @@ class StackOverflowScraper:
             params['intitle'] = search_term
         
         try:
-            response = requests.get(
-                f"{self.base_url}/search/advanced",
-                params=params,
-                headers=self.headers
-            )
-            response.raise_for_status()
-            
-            data = response.json()
+            data = self._get_json(f"{self.base_url}/search/advanced", params)
             if 'items' in data:
                 questions.extend(data['items'])
                 
@@ -148,14 +266,7 @@ class StackOverflowScraper:
                 else:
                     params['page'] += 1
                 
-                time.sleep(1)  # Rate limiting
-                response = requests.get(
-                    f"{self.base_url}/search/advanced",
-                    params=params,
-                    headers=self.headers
-                )
-                response.raise_for_status()
-                data = response.json()
+                data = self._get_json(f"{self.base_url}/search/advanced", params)
                 
                 if 'items' in data:
                     questions.extend(data['items'])
@@ -175,7 +286,7 @@ class StackOverflowScraper:
         Returns:
             Dictionary mapping question_id to list of answers
         """
-        answers = {}
+        answers = defaultdict(list)
         
         # Process in batches of 100 (API limit)
         batch_size = 100
@@ -190,29 +301,17 @@ class StackOverflowScraper:
                 'pagesize': 100
             }
             
-            # Add question IDs to params
-            params['ids'] = ';'.join(map(str, batch))
+            # Question IDs go in the path; the endpoint has no ids parameter
+            ids = ';'.join(map(str, batch))
             
             try:
-                response = requests.get(
-                    f"{self.base_url}/questions/{';'.join(map(str, batch))}/answers",
-                    params=params,
-                    headers=self.headers
-                )
-                response.raise_for_status()
-                
-                data = response.json()
+                data = self._get_json(f"{self.base_url}/questions/{ids}/answers", params)
                 if 'items' in data:
                     for answer in data['items']:
-                        question_id = answer.get('question_id')
-                        if question_id not in answers:
-                            answers[question_id] = []
-                        answers[question_id].append(answer)
+                        answers[answer.get('question_id')].append(answer)
                         
             except Exception as e:
                 print(f"❌ Error getting answers for batch: {e}")
-                
-            time.sleep(1)  # Rate limiting
             
         return answers
 
@@ -230,18 +329,15 @@ class StackOverflowScraper:
             return ""
             
         # Remove HTML tags
-        text = re.sub(r'<[^>]+>', '', text)
+        if '<' in text:
+            text = _TAG_RE.sub('', text)
         
         # Decode HTML entities
-        text = text.replace('&amp;', '&')
-        text = text.replace('&lt;', '<')
-        text = text.replace('&gt;', '>')
-        text = text.replace('&quot;', '"')
-        text = text.replace('&#39;', "'")
-        text = text.replace('&nbsp;', ' ')
+        if '&' in text:
+            text = html.unescape(text)
         
         # Clean up whitespace
-        text = re.sub(r'\s+', ' ', text)
+        text = _WS_RE.sub(' ', text)
         text = text.strip()
         
         return text
@@ -258,8 +354,8 @@ class StackOverflowScraper:
             Safe filename
         """
         # Clean the title
-        safe_title = re.sub(r'[^\w\s-]', '', title)
-        safe_title = re.sub(r'[-\s]+', '_', safe_title)
+        safe_title = _UNSAFE_RE.sub('', title)
+        safe_title = _DASH_RE.sub('_', safe_title)
         safe_title = safe_title.strip('_')
         
         # Limit length and add question ID
@@ -292,7 +388,7 @@ class StackOverflowScraper:
         filepath = self.docs_path / filename
         
         # Prepare content
-        content = f"""Stack Overflow Question: {title}
+        parts = [f"""Stack Overflow Question: {title}
 Question ID: {question_id}
 Score: {score}
 Views: {view_count}
@@ -303,27 +399,65 @@ URL: https://stackoverflow.com/questions/{question_id}
 QUESTION:
 {body}
 
-"""
+"""]
         
         # Add answers
         if answers:
-            content += "ANSWERS:\n\n"
+            parts.append("ANSWERS:\n\n")
+            separator = "-" * 80
             for i, answer in enumerate(answers, 1):
                 answer_body = self.clean_text(answer.get('body', ''))
                 answer_score = answer.get('score', 0)
                 answer_id = answer.get('answer_id', 0)
                 
-                content += f"Answer {i} (Score: {answer_score}, ID: {answer_id}):\n"
-                content += f"https://stackoverflow.com/a/{answer_id}\n\n"
-                content += f"{answer_body}\n\n"
-                content += "-" * 80 + "\n\n"
-        
-        # Save to file
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(content)
+                parts.append(
+                    f"Answer {i} (Score: {answer_score}, ID: {answer_id}):\n"
+                    f"https://stackoverflow.com/a/{answer_id}\n\n"
+                    f"{answer_body}\n\n"
+                    f"{separator}\n\n"
+                )
+        
+        content = "".join(parts)
+        
+        # Save to file in a single write of the pre-encoded bytes
+        filepath.write_bytes(content.encode('utf-8'))
             
         return filename
 
+    def _scrape_one(self, job: Tuple[Optional[str], Optional[str]], max_questions: int,
+                    seen_ids: Set[int], seen_lock: threading.Lock) -> Tuple[List[Dict], List[Dict], Dict[int, List[Dict]]]:
+        """
+        Fetch questions and their answers for a single tag or search term
+        
+        Args:
+            job: (tag, search_term) tuple with exactly one of the two set
+            max_questions: Maximum questions to fetch answers for
+            seen_ids: Question IDs already claimed by other jobs in this run
+            seen_lock: Lock guarding seen_ids across worker threads
+            
+        Returns:
+            Tuple of (all questions found, questions new to this run, answers keyed by question_id)
+        """
+        tag, term = job
+        questions = self.search_questions(tag=tag, search_term=term)
+        if not questions:
+            return questions, [], {}
+        
+        # Most questions carry several Adobe tags; only the first job to see one keeps it
+        new_questions = []
+        with seen_lock:
+            for question in questions[:max_questions]:
+                question_id = question['question_id']
+                if question_id not in seen_ids:
+                    seen_ids.add(question_id)
+                    new_questions.append(question)
+        
+        if not new_questions:
+            return questions, new_questions, {}
+        
+        question_ids = [q['question_id'] for q in new_questions]
+        return questions, new_questions, self.get_answers(question_ids)
+
     def scrape_adobe_content(self, max_questions_per_tag: int = 50) -> List[str]:
         """
         Main function to scrape Adobe-related content from Stack Overflow
@@ -336,57 +470,46 @@ QUESTION:
         """
         saved_files = []
         total_questions = 0
+        seen_ids: Set[int] = set()
+        seen_lock = threading.Lock()
+        
+        self._prune_response_cache()
         
         print("🚀 Starting Stack Overflow scraping for Adobe content...")
         print(f"📁 Saving files to: {self.docs_path}")
         
-        # Search by tags
-        print("\n🔍 Searching by Adobe-related tags...")
-        for tag in self.adobe_tags:
-            print(f"  Searching tag: {tag}")
-            questions = self.search_questions(tag=tag)
-            
-            if questions:
-                # Get answers for these questions
-                question_ids = [q['question_id'] for q in questions[:max_questions_per_tag]]
-                answers = self.get_answers(question_ids)
-                
-                # Save content
-                for question in questions[:max_questions_per_tag]:
-                    question_answers = answers.get(question['question_id'], [])
-                    filename = self.save_qa_content(question, question_answers)
-                    saved_files.append(filename)
-                    total_questions += 1
-                    
-                print(f"    ✅ Found {len(questions)} questions, saved {min(len(questions), max_questions_per_tag)}")
-            else:
-                print(f"    ⚠️  No questions found for tag: {tag}")
-                
-            time.sleep(2)  # Rate limiting between tags
+        jobs = [(tag, None) for tag in self.adobe_tags] + [(None, term) for term in self.search_terms]
         
-        # Search by terms
-        print("\n🔍 Searching by Adobe-related terms...")
-        for term in self.search_terms:
-            print(f"  Searching term: {term}")
-            questions = self.search_questions(search_term=term)
+        def scrape_job(job):
+            return self._scrape_one(job, max_questions_per_tag, seen_ids, seen_lock)
+        
+        # The day's shelf stays open for the whole run and is closed even if a job fails
+        try:
+            # Tags and terms are fetched concurrently under the shared rate limit;
+            # executor.map yields in job order, so saving and reporting stay serial
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                results = executor.map(scrape_job, jobs)
             
-            if questions:
-                # Get answers for these questions
-                question_ids = [q['question_id'] for q in questions[:max_questions_per_tag]]
-                answers = self.get_answers(question_ids)
+                print("\n🔍 Searching by Adobe-related tags...")
+                for index, ((tag, term), (questions, new_questions, answers)) in enumerate(zip(jobs, results)):
+                    if index == len(self.adobe_tags):
+                        print("\n🔍 Searching by Adobe-related terms...")
+                    kind, label = ('tag', tag) if tag else ('term', term)
+                    print(f"  Searching {kind}: {label}")
                 
-                # Save content
-                for question in questions[:max_questions_per_tag]:
-                    question_answers = answers.get(question['question_id'], [])
-                    filename = self.save_qa_content(question, question_answers)
-                    saved_files.append(filename)
-                    total_questions += 1
-                    
-                print(f"    ✅ Found {len(questions)} questions, saved {min(len(questions), max_questions_per_tag)}")
-            else:
-                print(f"    ⚠️  No questions found for term: {term}")
-                
-            time.sleep(2)  # Rate limiting between terms
+                    if questions:
+                        # Save content
+                        for question in new_questions:
+                            question_answers = answers.get(question['question_id'], [])
+                            filename = self.save_qa_content(question, question_answers)
+                            saved_files.append(filename)
+                            total_questions += 1
+                        
+                        print(f"    ✅ Found {len(questions)} questions, saved {len(new_questions)} new")
+                    else:
+                        print(f"    ⚠️  No questions found for {kind}: {label}")
+        finally:
+            self._close_response_cache()
         
         print(f"\n🎉 Stack Overflow scraping completed!")
         print(f"📊 Summary:")